@@ -0,0 +1,56 @@
+"""
+Compare decimal_conversion.py against the builtin long() and str(), to find
+the number of digits where it starts paying off.
+
+Run from this directory: python benchmark.py
+"""
+
+import random
+from timeit import default_timer
+
+import decimal_conversion
+
+
+def time_it(function, argument, repeat):
+    """Return the average seconds per call over repeat calls."""
+
+    start = default_timer()
+    for _ in range(repeat):
+        function(argument)
+
+    return (default_timer() - start) / repeat
+# End of time_it()
+
+
+def main():
+    generator = random.Random(0)
+
+    print("%7s  %10s %10s %8s  %10s %10s %8s"
+          % ("digits", "long()", "str_to_int", "speedup",
+             "str()", "int_to_str", "speedup"))
+
+    for digits in [100, 1000, 3000, 10000, 30000, 100000, 300000]:
+        number = generator.randint(10**(digits - 1), 10**digits)
+        string = str(number)
+        repeat = max(1, 1000000 / digits)
+
+        # Warm up the cached powers and reciprocals
+        assert decimal_conversion.str_to_int(string) == number
+        assert decimal_conversion.int_to_str(number) == string
+
+        timings = []
+        for builtin, ours, argument in [
+                (long, decimal_conversion.str_to_int, string),
+                (str, decimal_conversion.int_to_str, number)]:
+            builtin_seconds = time_it(builtin, argument, repeat)
+            our_seconds = time_it(ours, argument, repeat)
+            timings += [builtin_seconds, our_seconds,
+                        builtin_seconds / our_seconds]
+
+        print("%7d  %9.5fs %9.5fs %7.2fx  %9.5fs %9.5fs %7.2fx"
+              % tuple([digits] + timings))
+# End of main()
+
+
+if __name__ == "__main__":
+    main()
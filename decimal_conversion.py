@@ -0,0 +1,187 @@
+"""
+Convert between decimal strings and ints in subquadratic time.
+
+The builtin long(string) and str(number) take quadratic time in the number of
+digits, which is more than the solvers of the big number challenges (Dodge the
+Lasers, Bomb Baby, Fuel Injection Perfection) take with million digit inputs.
+
+Both directions here split the number in halves around a power of ten,
+recurse on the halves, and leave the pieces of BASE_DIGITS digits to the
+builtins:
+
+    string -> int:  int(high) * 10^k + int(low)
+    int -> string:  str(n / 10^k) + str(n % 10^k), the low half zero padded
+
+The multiplication is Karatsuba for longs, so string -> int is about
+O(n^1.6). The long division is schoolbook though, so the division by 10^k is
+done as a multiplication by a cached reciprocal, computed with Newton's
+method, to keep int -> string subquadratic as well.
+
+The powers of ten are 10^(BASE_DIGITS * 2^j), each the square of the one
+before, and they are cached (along with the reciprocals) across calls.
+
+The challenges live in directories with hyphens, so their sol.py files import
+this by putting the root of the repo on sys.path just for the import. Foobar
+only takes the sol.py file though, so without this module they fall back to
+the builtins.
+"""
+
+
+# Pieces at most this long are left to the builtins
+BASE_DIGITS = 1000
+
+# Divisions by numbers up to this many bits are left to the builtins
+BASE_BITS = 16384
+
+
+POWERS_OF_TEN = []  # j -> 10^(BASE_DIGITS * 2^j)
+
+RECIPROCALS = {}  # j -> (floor(2^(2*shift) / 10^(BASE_DIGITS * 2^j)), shift)
+
+
+def get_power_of_ten(j):
+    """Return 10^(BASE_DIGITS * 2^j), squaring the cached ones as needed."""
+
+    if not POWERS_OF_TEN:
+        POWERS_OF_TEN.append(10**BASE_DIGITS)
+
+    while len(POWERS_OF_TEN) <= j:
+        POWERS_OF_TEN.append(POWERS_OF_TEN[-1] ** 2)
+
+    return POWERS_OF_TEN[j]
+# End of get_power_of_ten()
+
+
+def reciprocal(p):
+    """Return floor(2^(2*L) / p) for p > 0 of L bits, by Newton's method."""
+
+    L = p.bit_length()
+    if L <= BASE_BITS:
+        return (1 << (2 * L)) // p
+
+    # The top h bits of p give the top h or so bits of the reciprocal
+    h = L // 2 + 1
+    x = reciprocal(p >> (L - h)) << (L - h)
+
+    # A Newton step on f(x) = 1/x - p/2^(2L) doubles the correct bits
+    one = 1 << (2 * L)
+    x += (x * (one - p * x)) >> (2 * L)
+
+    # It's off by a few at most now
+    remainder = one - p * x
+    while remainder < 0:
+        x -= 1
+        remainder += p
+    while remainder >= p:
+        x += 1
+        remainder -= p
+
+    return x
+# End of reciprocal()
+
+
+def divmod_power_of_ten(n, j):
+    """Return divmod(n, p) for p = 10^(BASE_DIGITS * 2^j) and 0 <= n < p^2."""
+
+    p = get_power_of_ten(j)
+
+    if p.bit_length() <= BASE_BITS:
+        return divmod(n, p)
+
+    if j not in RECIPROCALS:
+        RECIPROCALS[j] = (reciprocal(p), p.bit_length())
+    inverse, shift = RECIPROCALS[j]
+
+    # n < p^2 < 2^(2*shift), so this is off by a few at most
+    quotient = (n * inverse) >> (2 * shift)
+    remainder = n - quotient * p
+
+    while remainder < 0:
+        quotient -= 1
+        remainder += p
+    while remainder >= p:
+        quotient += 1
+        remainder -= p
+
+    return quotient, remainder
+# End of divmod_power_of_ten()
+
+
+def digits_to_int(digits):
+    """Return the int of a string of decimal digits."""
+
+    if len(digits) <= BASE_DIGITS:
+        return int(digits)
+
+    # Split at the biggest cached power below the length
+    j, k = 0, BASE_DIGITS
+    while 2 * k < len(digits):
+        j, k = j + 1, 2 * k
+
+    return (digits_to_int(digits[:-k]) * get_power_of_ten(j)
+            + digits_to_int(digits[-k:]))
+# End of digits_to_int()
+
+
+def int_to_digits(n, j, width, pieces):
+    """
+    Append the decimal digits of 0 <= n < 10^(BASE_DIGITS * 2^(j+1)) to
+    pieces, zero padded to width digits (if width isn't 0).
+    """
+
+    if j < 0:
+        digits = str(n)
+        pieces.append(digits.zfill(width) if width else digits)
+        return
+
+    high, low = divmod_power_of_ten(n, j)
+    k = BASE_DIGITS << j
+
+    if width:
+        int_to_digits(high, j - 1, width - k, pieces)
+    elif high:
+        int_to_digits(high, j - 1, 0, pieces)
+    else:  # No leading zeroes
+        int_to_digits(low, j - 1, 0, pieces)
+        return
+
+    int_to_digits(low, j - 1, k, pieces)
+# End of int_to_digits()
+
+
+def str_to_int(string):
+    """Same as long(string) for a decimal string, but subquadratic."""
+
+    digits = string.strip()
+    sign = 1
+
+    if digits[:1] in ("+", "-"):
+        sign = -1 if digits[0] == "-" else 1
+        digits = digits[1:]
+
+    if not digits.isdigit():
+        raise ValueError("invalid literal for str_to_int(): %r" % string)
+
+    return sign * digits_to_int(digits)
+# End of str_to_int()
+
+
+def int_to_str(n):
+    """Same as str(n) for an int n, but subquadratic."""
+
+    if n < 0:
+        return "-" + int_to_str(-n)
+
+    # Find the smallest j with n < 10^(BASE_DIGITS * 2^(j+1))
+    j = -1
+    while n >= get_power_of_ten(j + 1):
+        j += 1
+
+    pieces = []
+    int_to_digits(n, j, 0, pieces)
+
+    return "".join(pieces)
+# End of int_to_str()
+
+
+# End of file
@@ -0,0 +1,67 @@
+"""
+Compare the loop of solution() against count_generations() (half-GCD) on
+random coprime bomb counts, to find where half-GCD starts paying off.
+
+Run from this directory: python benchmark.py
+"""
+
+import random
+from fractions import gcd
+from timeit import default_timer
+
+import sol
+
+
+def random_bombs(digits, generator):
+    """Return random coprime (mach, facula) of about digits digits."""
+
+    while True:
+        mach = generator.randint(10**(digits - 1), 10**digits)
+        facula = generator.randint(10**(digits - 1), 10**digits)
+        if gcd(mach, facula) == 1:
+            return mach, facula
+# End of random_bombs()
+
+
+def time_it(function, *args):
+    """Return (result, seconds) of a single call."""
+
+    start = default_timer()
+    result = function(*args)
+    return result, default_timer() - start
+# End of time_it()
+
+
+def loop_solution(mach, facula):
+    """Run solution() with the half-GCD switched off."""
+
+    threshold, sol.HALF_GCD_BITS = sol.HALF_GCD_BITS, float("inf")
+    try:
+        return sol.solution(str(mach), str(facula))
+    finally:
+        sol.HALF_GCD_BITS = threshold
+# End of loop_solution()
+
+
+def main():
+    generator = random.Random(0)
+
+    print("%7s  %10s %10s %8s" % ("digits", "loop", "half-GCD", "speedup"))
+
+    for digits in [1000, 2000, 3000, 5000, 10000, 30000, 100000]:
+        mach, facula = random_bombs(digits, generator)
+
+        expected, loop_seconds = time_it(loop_solution, mach, facula)
+        result, half_gcd_seconds = time_it(sol.count_generations, mach,
+                                           facula)
+
+        assert result == expected, "count_generations() disagrees"
+
+        print("%7d  %9.4fs %9.4fs %7.2fx" % (digits, loop_seconds,
+                                             half_gcd_seconds,
+                                             loop_seconds / half_gcd_seconds))
+# End of main()
+
+
+if __name__ == "__main__":
+    main()
@@ -24,13 +24,43 @@ bombs of next generation for either type.
 """
 
 
+import os
+import sys
+
+
+# decimal_conversion.py is at the root of the repo, see its docstring.
+repo_root = os.path.normpath(os.path.join(os.path.dirname(
+    os.path.abspath(__file__)), os.pardir, os.pardir))
+
+# Only put it on sys.path (and take it off) if it isn't there already
+on_path = repo_root in sys.path
+if not on_path:
+    sys.path.append(repo_root)
+try:
+    from decimal_conversion import int_to_str, str_to_int
+except ImportError:
+    int_to_str, str_to_int = str, long
+finally:
+    if not on_path:
+        sys.path.remove(repo_root)
+    del repo_root, on_path
+
+
+# Past this many bits, the quadratic loop of solution() loses to half-GCD
+HALF_GCD_BITS = 2048
+
+
 def solution(mach, facula):
     # Convert str to long int, numbers are in the range [1, 1e50]
-    mach, facula = [long(mach)], [long(facula)]  # List for using by reference.
+    # List for using by reference.
+    mach, facula = [str_to_int(mach)], [str_to_int(facula)]
+
+    if max(mach[0], facula[0]).bit_length() > HALF_GCD_BITS:
+        return count_generations(mach[0], facula[0])
 
     # One can't have equal numbers of both bombs, unless it's the start state.
     if mach == facula:
-        return "0" if mach == 1 else "impossible"
+        return "0" if mach[0] == 1 else "impossible"
 
     # Start state is when we have one bomb of each type
     start_state = False
@@ -66,5 +96,156 @@ def solution(mach, facula):
 
         start_state = generated[0] == generator[0] == 1
 
-    return str(generations)
+    if generations == "impossible":
+        return generations
+
+    return int_to_str(generations)
 # End of solution()
+
+
+def multiply_matrices(M, N):
+    """Return the product of 2x2 matrices M and N."""
+
+    (a, b), (c, d) = M
+    (e, f), (g, h) = N
+
+    return ((a*e + b*g, a*f + b*h), (c*e + d*g, c*f + d*h))
+# End of multiply_matrices()
+
+
+def euclid_steps(a, b, bits):
+    """
+    Run Euclid's algorithm on a >= b until b < 2^bits, and return
+    (M, quotients, a', b') with (a, b) = M (a', b').
+
+    Each step (x, y) -> (y, x % y) is (x, y) = [[q, 1], [1, 0]] (y, x % y),
+    and M is the product of those.
+    """
+
+    m00, m01, m10, m11 = 1, 0, 0, 1
+    quotients = []
+    limit = 1 << bits
+
+    while b >= limit and b:
+        q, r = divmod(a, b)
+        quotients.append(q)
+        a, b = b, r
+
+        m00, m01 = m00*q + m01, m00
+        m10, m11 = m10*q + m11, m10
+
+    return ((m00, m01), (m10, m11)), quotients, a, b
+# End of euclid_steps()
+
+
+def reduce_pair(M, quotients, a, b):
+    """
+    Return (M, a', b') with (a', b') = M^-1 (a, b), where M and quotients
+    came from the top bits of a and b.
+
+    The last of those quotients can be wrong for a and b themselves, so
+    they are dropped (from quotients too) until a' > b' >= 0. Working back
+    from there, every remainder is then below its divisor, so every quotient
+    left is the one Euclid's algorithm would take.
+    """
+
+    (m00, m01), (m10, m11) = M
+
+    # det M = (-1)^len(quotients)
+    sign = -1 if len(quotients) & 1 else 1
+    x = sign * (m11*a - m01*b)
+    y = sign * (m00*b - m10*a)
+
+    # If y = 0, the last step needs q >= 2 for the one before to be x > y
+    while quotients and not (x > y > 0 or
+                             (x > y == 0 and quotients[-1] >= 2)):
+        q = quotients.pop()
+        x, y = q*x + y, x
+
+        m00, m01 = m01, m00 - q*m01
+        m10, m11 = m11, m10 - q*m11
+
+    return ((m00, m01), (m10, m11)), x, y
+# End of reduce_pair()
+
+
+def half_gcd(a, b):
+    """
+    Run about the first half of Euclid's algorithm on a >= b, until b is
+    below sqrt(a) or so, in subquadratic time. Returns the same as
+    euclid_steps().
+
+    The quotients of the top half of the bits of a and b are mostly those of
+    a and b, so half_gcd() of the top halves does a quarter of the work and
+    reduce_pair() applies it to the full numbers. A second half_gcd() on the
+    top bits of what's left does the next quarter, and euclid_steps() then
+    finishes the few steps left over.
+    """
+
+    n = a.bit_length()
+    m = n // 2
+
+    if b >> m == 0:
+        return ((1, 0), (0, 1)), [], a, b
+
+    if n <= HALF_GCD_BITS:
+        return euclid_steps(a, b, m)
+
+    M, quotients, _, _ = half_gcd(a >> m, b >> m)
+    M, a, b = reduce_pair(M, quotients, a, b)
+
+    # Without progress, the shift below would recurse on a and b again
+    if b >> m and a.bit_length() < n:
+        shift = 2*m - a.bit_length()
+
+        M_next, quotients_next, _, _ = half_gcd(a >> shift, b >> shift)
+        M_next, a, b = reduce_pair(M_next, quotients_next, a, b)
+
+        M = multiply_matrices(M, M_next)
+        quotients += quotients_next
+
+    M_next, quotients_next, a, b = euclid_steps(a, b, m)
+
+    return multiply_matrices(M, M_next), quotients + quotients_next, a, b
+# End of half_gcd()
+
+
+def count_generations(mach, facula):
+    """
+    Same as solution(), for ints, with half_gcd().
+
+    The loop of solution() is Euclid's algorithm on (mach, facula), adding
+    up the quotients, except that it stops at 1 instead of 0 and hence adds
+    one less for the last quotient. It's impossible unless gcd is 1.
+    """
+
+    a, b = max(mach, facula), min(mach, facula)
+
+    # We start with one bomb each, there are never less.
+    if b < 1:
+        return "impossible"
+
+    if a == b:
+        return "0" if a == 1 else "impossible"
+
+    generations = -1  # The last quotient is one more than solution() adds
+
+    while b.bit_length() > HALF_GCD_BITS:
+        _, quotients, a, b = half_gcd(a, b)
+        generations += sum(quotients)
+
+        if not quotients:
+            # b is below sqrt(a) already, one division evens them out
+            q, r = divmod(a, b)
+            generations += q
+            a, b = b, r
+
+    _, quotients, a, b = euclid_steps(a, b, 0)
+    generations += sum(quotients)
+
+    # a is the gcd now
+    if a != 1:
+        return "impossible"
+
+    return int_to_str(generations)
+# End of count_generations()
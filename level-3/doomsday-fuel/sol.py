@@ -1,7 +1,13 @@
+from collections import OrderedDict
 from fractions import Fraction, gcd
 from itertools import starmap
 from operator import mul, sub
 
+try:
+    import numpy
+except ImportError:  # The float fast path is optional (foobar lacks it)
+    numpy = None
+
 
 def transpose(matrix):
     """Return transpose of a matrix."""
@@ -101,39 +107,35 @@ def invert_matrix(A):
 # End of invert_matrix()
 
 
-def move_terminal_rows_to_end(transition_matrix, absorbing_states):
-    """
-    Move all zero rows to the bottom/end of the matrix while preserving order.
+def get_Q_and_R(transition_matrix, transient_states, absorbing_states):
     """
+    Return Q and R (as Fractions) by reading the matrix through the index
+    lists of the transient and absorbing states, instead of moving the
+    terminal rows (and columns) to the end of a copy of the whole matrix.
 
-    t_mat = transition_matrix  # New reference, this doesn't copy
-    last_index = len(t_mat) - 1
-    num_absorbing_states = len(absorbing_states)
-
-    for i in range(num_absorbing_states):
-        # Get the index of the bottom-most zero row vector.
-        state = absorbing_states.pop(-1)
-
-        if state != last_index:
-            # Interchange rows
-            t_mat[state], t_mat[last_index] = t_mat[last_index], t_mat[state]
+    Row i of Q and R is transient_states[i], column j of Q is
+    transient_states[j] and column j of R is absorbing_states[j].
+    """
 
-            # Interchange columns
-            for row in t_mat:
-                row[state], row[last_index] = row[last_index], row[state]
+    Q, R = [], []
 
-        # Decrement for next iteration.
-        last_index -= 1
+    for i in transient_states:
+        row = transition_matrix[i]
+        denominator = sum(row)
+        Q.append([Fraction(row[j], denominator) for j in transient_states])
+        R.append([Fraction(row[j], denominator) for j in absorbing_states])
 
-    return t_mat
-# End of move_terminal_rows_to_end()
+    return Q, R
+# End of get_Q_and_R()
 
 
-def get_probabilities_list(transition_matrix, number_of_states, t):
+def get_probabilities_list(transition_matrix, transient_states,
+                           absorbing_states):
     """
     For t transient states and s absorbing states,
     P = [Q,  R ] whose orders respectively are [txt, txs]
         [0, I_s]                               [sxt, sxs]
+    (after reordering the states, which get_Q_and_R() does by index)
     The fundamental matrix is given by the inverse of matrix (I_t - Q).
     (Note: I_x is identity matrix of order x.)
 
@@ -141,19 +143,10 @@ def get_probabilities_list(transition_matrix, number_of_states, t):
     entry (i,j) of matrix N*R
     """
 
-    Q, R = [], []
-
-    for i, row in enumerate(transition_matrix):
-        denominator = sum(row)
-        if i < t:
-            Q.append([numerator / denominator for numerator in row[:t]])
-            R.append([numerator / denominator for numerator in row[t:]])
-            # row[t:] is equivalent to row[-s:] as total states = t + s
-        else:
-            break
+    Q, R = get_Q_and_R(transition_matrix, transient_states, absorbing_states)
 
     # N = (I_t - Q)^-1
-    N = invert_matrix(subtract_matrices(get_identity_matrix(t), Q))
+    N = invert_matrix(subtract_matrices(get_identity_matrix(len(Q)), Q))
 
     # We just need the solution starting from state 0.
     return multiply_matrices(N, R)[0]
@@ -166,39 +159,815 @@ def lcm(a, b):
 # End of lcm()
 
 
+def to_common_denominator(probabilities):
+    """Return [numerators..., denominator] for a list of Fractions."""
+
+    numerators = [probability.numerator for probability in probabilities]
+    denominators = [probability.denominator for probability in probabilities]
+
+    denominator_lcm = reduce(lcm, denominators)
+
+    for index, numerator in enumerate(numerators):
+        numerators[index] *= denominator_lcm / denominators[index]
+
+    numerators.append(denominator_lcm)
+
+    return numerators
+# End of to_common_denominator()
+
+
+def bareiss_solve(A, b):
+    """
+    Solve A x = b for a sq. matrix of ints using Bareiss' fraction-free
+    Gaussian elimination.
+
+    Every division in the elimination is exact, so all the entries stay ints
+    (and only as big as minors of A), unlike with Fractions which need a gcd
+    on every operation.
+
+    Returns (x, determinant), with the actual solution being x / determinant.
+    """
+
+    order = len(A)
+
+    # [A | b] but in a new list/matrix, so A isn't modified.
+    M = [list(row) + [value] for row, value in zip(A, b)]
+
+    previous_pivot = 1
+
+    for i in range(order):
+        # Get a non-zero pivot, swapping rows if needed.
+        if M[i][i] == 0:
+            for row in range(i+1, order):
+                if M[row][i] != 0:
+                    M[i], M[row] = M[row], M[i]
+                    break
+            else:  # If no break
+                raise RuntimeError("The matrix couldn't be inverted.")
+
+        pivot_row = M[i]
+        pivot = pivot_row[i]
+
+        # Make all entries below the pivot zero.
+        for row in M[i+1:]:
+            multiple = row[i]
+            row[i] = 0
+            for col in range(i+1, order+1):
+                row[col] = (pivot*row[col] - multiple*pivot_row[col]) \
+                    // previous_pivot
+
+        previous_pivot = pivot
+
+    # The last pivot is the determinant (up to the sign of the row swaps).
+    determinant = M[-1][-2]
+
+    # Back substitution of A (determinant * x) = (determinant * b)
+    x = [0] * order
+    for i in range(order-1, -1, -1):
+        x[i] = (determinant * M[i][order]
+                - sum(M[i][j] * x[j] for j in range(i+1, order))) // M[i][i]
+
+    return x, determinant
+# End of bareiss_solve()
+
+
+def get_start_state_numerators(transition_matrix, transient_states,
+                               absorbing_states):
+    """
+    Return (numerators, denominator) of the probabilities of being absorbed by
+    each of absorbing_states when starting from state 0, which is transient.
+
+    Only row 0 of N*R is needed, i.e. x = e_0 * N * R. Scaling every row i of
+    (I_t - Q) by its row sum s_i makes it an integer matrix A = S * (I_t - Q),
+    so N = A^-1 * S, and S*R is just the integer counts of the matrix. Thus,
+        x = y * (S*R)  where  A^T * y^T = e_0^T
+    which is a single fraction-free solve, without inverting anything.
+    """
+
+    A_transpose, e_0 = get_fraction_free_system(transition_matrix,
+                                                transient_states)
+
+    y, denominator = bareiss_solve(A_transpose, e_0)
+
+    return (get_absorbed_numerators(transition_matrix, transient_states,
+                                    absorbing_states, y),
+            denominator)
+# End of get_start_state_numerators()
+
+
+def get_fraction_free_system(transition_matrix, transient_states):
+    """
+    Return (A^T, e_0) of the system A^T * y^T = e_0^T, where A is (I_t - Q)
+    with every row i scaled by its row sum s_i, i.e. an integer matrix.
+    """
+
+    t_mat = transition_matrix
+
+    # A^T, with (A^T)[j][i] = A[i][j] = s_i*[i == j] - count from i to j
+    A_transpose = [[(sum(t_mat[i]) if i == j else 0) - t_mat[i][j]
+                    for i in transient_states] for j in transient_states]
+
+    # State 0 is the first transient state.
+    e_0 = [1] + [0] * (len(transient_states) - 1)
+
+    return A_transpose, e_0
+# End of get_fraction_free_system()
+
+
+def get_absorbed_numerators(transition_matrix, transient_states,
+                            absorbing_states, y):
+    """Return y * (S*R), i.e. the numerators of row 0 of N*R."""
+
+    t_mat = transition_matrix
+
+    return [sum(y_i * t_mat[i][j] for y_i, i in zip(y, transient_states))
+            for j in absorbing_states]
+# End of get_absorbed_numerators()
+
+
+def split_states(transition_matrix):
+    """Return (transient_states, absorbing_states), both in order."""
+
+    transient_states, absorbing_states = [], []
+    for index, row in enumerate(transition_matrix):
+        (transient_states if any(row) else absorbing_states).append(index)
+
+    return transient_states, absorbing_states
+# End of split_states()
+
+
+def to_simplest_form(numerators, denominator):
+    """
+    Return [numerators..., denominator] in simplest form, with a positive
+    denominator, for numerators with a common denominator.
+    """
+
+    divisor = abs(reduce(gcd, numerators, denominator))
+    if denominator < 0:
+        divisor = -divisor
+
+    # int() gives back plain ints for anything which fits, like solution()
+    return ([int(numerator / divisor) for numerator in numerators]
+            + [int(denominator / divisor)])
+# End of to_simplest_form()
+
+
+def fraction_free_solution(transition_matrix):
+    """
+    Same as solution(), but without Fractions or inverting a matrix at all.
+    Only the start state's row is solved for, fraction-free, and there's one
+    common denominator which is reduced at the end.
+    """
+
+    transient_states, absorbing_states = split_states(transition_matrix)
+
+    # If state 0 is terminal, it will stay there.
+    if transient_states[:1] != [0]:
+        return [int(state == 0) for state in absorbing_states] + [1]
+
+    numerators, denominator = get_start_state_numerators(
+        transition_matrix, transient_states, absorbing_states
+    )
+
+    return to_simplest_form(numerators, denominator)
+# End of fraction_free_solution()
+
+
 def solution(transition_matrix):
 
     # If just state 0 is there, it will stay there.
     if len(transition_matrix) == len(transition_matrix[0]) == 1:
         return [1, 1]
 
-    # Convert ints to fractions for convenience in dealing with probability.
-    transition_matrix = [map(Fraction, states) for states in transition_matrix]
+    # Get indices of transient and terminal states (with 0 probability to
+    # transition) in a single pass, without copying any row.
+    transient_states, absorbing_states = split_states(transition_matrix)
 
-    # Get indices of terminal states (with 0 probability to transition).
-    absorbing_states = [index for index, row in enumerate(transition_matrix)
-                        if set(row) == {0}]
+    # If state 0 is terminal, it will stay there.
+    if transient_states[:1] != [0]:
+        return [int(state == 0) for state in absorbing_states] + [1]
 
-    number_of_states = len(transition_matrix)
-    number_of_transient_states = number_of_states - len(absorbing_states)
+    # Get the list having the required probabilities
+    probabilities = get_probabilities_list(transition_matrix, transient_states,
+                                           absorbing_states)
 
-    # Move the terminal states' row to the end
-    transition_matrix = move_terminal_rows_to_end(transition_matrix,
-                                                  absorbing_states)
+    return to_common_denominator(probabilities)
+# End of solution()
 
-    # Get the list having the required probabilities
-    probabilities = get_probabilities_list(transition_matrix, number_of_states,
-                                           number_of_transient_states)
 
-    numerators = [probability.numerator for probability in probabilities]
-    denominators = [probability.denominator for probability in probabilities]
+def rows_from_matrix(transition_matrix):
+    """Return the sparse dict-of-rows form {state: {next_state: count}}."""
 
-    denominator_lcm = reduce(lcm, denominators)
+    return dict((state, dict((next_state, count)
+                             for next_state, count in enumerate(row) if count))
+                for state, row in enumerate(transition_matrix))
+# End of rows_from_matrix()
 
-    for index, numerator in enumerate(numerators):
-        numerators[index] *= denominator_lcm / denominators[index]
 
-    numerators.append(denominator_lcm)
+def get_transient_components(rows, start):
+    """
+    Return the strongly connected components of the transient states which
+    are reachable from start, in topological order (start's one first).
 
-    return numerators
-# End of solution()
+    This is Tarjan's algorithm, but iterative, since a chain can be thousands
+    of states deep. Unreachable states are never looked at.
+    """
+
+    def transient_successors(state):
+        return iter([next_state for next_state, count in rows[state].items()
+                     if count and any(rows.get(next_state, {}).values())])
+
+    index, lowlink = {start: 0}, {start: 0}
+    stack, on_stack = [start], {start}
+    components = []
+
+    work = [(start, transient_successors(start))]
+
+    while work:
+        state, successors = work[-1]
+
+        for next_state in successors:
+            if next_state not in index:  # Go deeper
+                index[next_state] = lowlink[next_state] = len(index)
+                stack.append(next_state)
+                on_stack.add(next_state)
+                work.append((next_state, transient_successors(next_state)))
+                break
+            elif next_state in on_stack:
+                lowlink[state] = min(lowlink[state], index[next_state])
+        else:  # If no break, i.e. all successors are done
+            work.pop()
+
+            if work:
+                parent = work[-1][0]
+                lowlink[parent] = min(lowlink[parent], lowlink[state])
+
+            # state is the root of a component, which is on top of the stack
+            if lowlink[state] == index[state]:
+                component = []
+                while not component or component[-1] != state:
+                    component.append(stack.pop())
+                    on_stack.remove(component[-1])
+                components.append(component)
+
+    # Tarjan finds a component only after all the ones reachable from it
+    components.reverse()
+
+    return components
+# End of get_transient_components()
+
+
+def solve_component(rows, component, mass):
+    """
+    Return z, with z[state] = (expected visits to state) / (its row sum), for
+    the states of a component, given the probability mass entering them.
+
+    Within the component, with A = S * (I - Q) as in
+    get_start_state_numerators(), the visits v satisfy (I - Q)^T v = mass,
+    i.e. A^T z = mass with z = S^-1 v. The mass flowing from state to any
+    next_state outside is then just z[state] * count.
+    """
+
+    # A lone state (the most common case) needs no elimination at all.
+    if len(component) == 1:
+        state = component[0]
+        row = rows[state]
+        return {state: mass.get(state, 0) / Fraction(
+            sum(row.values()) - row.get(state, 0))}
+
+    A_transpose = [[(sum(rows[i].values()) if i == j else 0)
+                    - rows[i].get(j, 0) for i in component] for j in component]
+
+    # Make the entering mass integral for bareiss_solve()
+    entering = [Fraction(mass.get(state, 0)) for state in component]
+    common_denominator = reduce(lcm, [value.denominator for value in entering])
+
+    z, determinant = bareiss_solve(
+        A_transpose,
+        [value.numerator * (common_denominator / value.denominator)
+         for value in entering]
+    )
+
+    return dict((state, Fraction(z_state, determinant * common_denominator))
+                for state, z_state in zip(component, z))
+# End of solve_component()
+
+
+def sparse_solution(rows, number_of_states=None):
+    """
+    Same as solution(), but for a sparse chain: rows is {state: {next_state:
+    count}} (e.g. from rows_from_matrix()), where missing or empty rows are
+    terminal states. The terminal states are all the states up to
+    number_of_states if it's given, or else all the ones that are mentioned.
+
+    Only states reachable from state 0 are looked at. The transient ones are
+    split into strongly connected components, and the probability mass from
+    state 0 is pushed through them in topological order, solving one small
+    system per component. So the cost grows with the reachable and cyclic
+    part of the chain, rather than with n^3.
+    """
+
+    if number_of_states is None:
+        states = set(rows)
+        for row in rows.values():
+            states.update(row)
+        states.add(0)
+    else:
+        states = range(number_of_states)
+
+    rows = dict((state, row) for state, row in rows.items()
+                if any(row.values()))
+    terminal_states = sorted(state for state in states if state not in rows)
+
+    # If state 0 is terminal, it will stay there.
+    if 0 not in rows:
+        return [int(state == 0) for state in terminal_states] + [1]
+
+    mass = {0: Fraction(1)}
+    absorbed = dict((state, Fraction(0)) for state in terminal_states)
+
+    for component in get_transient_components(rows, 0):
+        z = solve_component(rows, component, mass)
+        members = set(component)
+
+        for state in component:
+            for next_state, count in rows[state].items():
+                if next_state in members or not count:
+                    continue
+
+                target = absorbed if next_state not in rows else mass
+                target[next_state] = target.get(next_state, 0) \
+                    + z[state] * count
+
+    return to_common_denominator([absorbed[state]
+                                  for state in terminal_states])
+# End of sparse_solution()
+
+
+def integer_sqrt(n):
+    """Return floor(sqrt(n)) for a non-negative integer, without floats."""
+
+    if n < 2:
+        return n
+
+    # Newton's method, starting from a power of 2 above the root
+    root = 1 << ((n.bit_length() + 1) // 2)
+
+    while True:
+        next_root = (root + n // root) // 2
+        if next_root >= root:
+            return root
+        root = next_root
+# End of integer_sqrt()
+
+
+def get_hadamard_bound(matrix):
+    """
+    Return Hadamard's bound on |det| of an int matrix (and on |minor|): the
+    product of the row norms, each rounded up.
+    """
+
+    hadamard_bound = 1
+    for row in matrix:
+        hadamard_bound *= integer_sqrt(sum(a*a for a in row)) + 1
+
+    return hadamard_bound
+# End of get_hadamard_bound()
+
+
+def is_word_sized_prime(n):
+    """
+    Miller-Rabin with bases 2, 3, 5 and 7, which has no false positives
+    below 3215031751, so it's deterministic for anything below 2^31.
+    """
+
+    if n < 2:
+        return False
+
+    for base in (2, 3, 5, 7):
+        if n % base == 0:
+            return n == base
+
+    # n - 1 = odd * 2^twos
+    odd, twos = n - 1, 0
+    while odd % 2 == 0:
+        odd, twos = odd // 2, twos + 1
+
+    for base in (2, 3, 5, 7):
+        x = pow(base, odd, n)
+        if x in (1, n - 1):
+            continue
+        for _ in range(twos - 1):
+            x = x * x % n
+            if x == n - 1:
+                break
+        else:  # If no break
+            return False
+
+    return True
+# End of is_word_sized_prime()
+
+
+def word_sized_primes():
+    """
+    Yield primes below 2^31 in decreasing order (products fit in 62 bits).
+    """
+
+    candidate = 2**31 - 1
+
+    while True:
+        if is_word_sized_prime(candidate):
+            yield candidate
+        candidate -= 2
+# End of word_sized_primes()
+
+
+def solve_modulo(args):
+    """
+    Solve A x = b modulo a prime with Gauss-Jordan (run in a worker).
+    Returns (prime, x), with x None if A is singular modulo the prime.
+    """
+
+    A, b, prime = args
+    order = len(A)
+
+    M = [[entry % prime for entry in row] + [value % prime]
+         for row, value in zip(A, b)]
+
+    for i in range(order):
+        # Get a non-zero pivot, swapping rows if needed.
+        for row in range(i, order):
+            if M[row][i]:
+                M[i], M[row] = M[row], M[i]
+                break
+        else:  # If no break, this is a bad prime (it divides the determinant)
+            return prime, None
+
+        # Make the leading one (Fermat's little theorem for the inverse).
+        inverse = pow(M[i][i], prime - 2, prime)
+        pivot_row = M[i] = [value * inverse % prime for value in M[i]]
+
+        # Make all other entries in the column zero.
+        for row in M:
+            multiple = row[i]
+            if multiple and row is not pivot_row:
+                for col in range(i, order+1):
+                    row[col] = (row[col] - multiple*pivot_row[col]) % prime
+
+    return prime, [row[order] for row in M]
+# End of solve_modulo()
+
+
+def rational_reconstruction(residue, modulus):
+    """
+    Return the Fraction a/b with |a|, b <= sqrt(modulus/2) and a = b*residue
+    (mod modulus), or None if there isn't any. It's unique when it exists.
+    """
+
+    bound = integer_sqrt(modulus // 2)
+
+    # Extended Euclid on (modulus, residue), stopped half way
+    r0, r1 = modulus, residue % modulus
+    s0, s1 = 0, 1
+
+    while r1 > bound:
+        quotient = r0 // r1
+        r0, r1 = r1, r0 - quotient*r1
+        s0, s1 = s1, s0 - quotient*s1
+
+    if s1 == 0 or abs(s1) > bound or gcd(r1, s1) not in (1, -1):
+        return None
+
+    return Fraction(r1, s1)  # Fraction takes care of the sign
+# End of rational_reconstruction()
+
+
+def certify_candidate(A_transpose, e_0, candidate):
+    """
+    Return (y, L) if the Fractions in candidate solve A^T x = e_0 exactly,
+    with L their common denominator and y = L*x as ints, else None.
+    """
+
+    # Verify: A^T (L*y) == L*e_0, all ints
+    common_denominator = reduce(lcm, [value.denominator
+                                      for value in candidate])
+    y = [value.numerator * (common_denominator / value.denominator)
+         for value in candidate]
+
+    if all(sum(a * y_i for a, y_i in zip(row, y)) == common_denominator * e
+           for row, e in zip(A_transpose, e_0)):
+        return y, common_denominator
+
+    return None
+# End of certify_candidate()
+
+
+def crt_solution(transition_matrix, processes=None, primes_per_round=4):
+    """
+    Same as solution(), but the fraction-free system of
+    fraction_free_solution() is solved modulo word-sized primes, which keeps
+    every number small no matter how big the exact answer is.
+
+    The residues are combined with the Chinese remainder theorem, and the
+    exact rationals are recovered by rational reconstruction once enough
+    primes are in. The candidate is checked by substituting it back into the
+    system with ints, so the result is exact (and identical to solution()).
+
+    The primes of a round are independent, so with processes they are solved
+    in a process pool.
+
+    Every entry of the answer is a ratio of minors of A^T, which are within
+    Hadamard's bound H, so a modulus above 2*H^2 always reconstructs it, and
+    the primes at which A^T is singular divide det A^T, so there are fewer of
+    them than H. Past either, A^T is singular.
+    """
+
+    transient_states, absorbing_states = split_states(transition_matrix)
+
+    # If state 0 is terminal, it will stay there.
+    if transient_states[:1] != [0]:
+        return [int(state == 0) for state in absorbing_states] + [1]
+
+    A_transpose, e_0 = get_fraction_free_system(transition_matrix,
+                                                transient_states)
+
+    hadamard_bound = get_hadamard_bound(A_transpose)
+
+    if processes:
+        # Not at the top, foobar blocks the thread module multiprocessing uses
+        from multiprocessing import Pool
+        pool = Pool(processes)
+    else:
+        pool = None
+    apply_all = pool.map if pool else map
+
+    primes = word_sized_primes()
+    modulus, residues = 1, [0] * len(e_0)
+    singular_product = 1  # Of the primes at which A^T is singular
+
+    try:
+        while True:
+            batch = [(A_transpose, e_0, next(primes))
+                     for _ in range(primes_per_round)]
+
+            for prime, y in apply_all(solve_modulo, batch):
+                if y is None:
+                    singular_product *= prime
+                    continue
+
+                # CRT: x = r (mod M) and x = y (mod p) -> x (mod M*p)
+                factor = (pow(modulus, prime - 2, prime) * modulus) % \
+                    (modulus * prime)
+                residues = [(r + (y_i - r) * factor) % (modulus * prime)
+                            for r, y_i in zip(residues, y)]
+                modulus *= prime
+
+            if singular_product > hadamard_bound:
+                raise RuntimeError("The matrix couldn't be inverted.")
+
+            candidate = [rational_reconstruction(r, modulus)
+                         for r in residues]
+
+            if None not in candidate:  # Else not enough primes yet
+                certified = certify_candidate(A_transpose, e_0, candidate)
+                if certified:
+                    break
+
+            # More primes can't help past this, see above
+            if modulus > 2 * hadamard_bound**2:
+                raise RuntimeError("The matrix couldn't be inverted.")
+    finally:
+        if pool:
+            pool.close()
+            pool.join()
+
+    y, common_denominator = certified
+
+    numerators = get_absorbed_numerators(transition_matrix, transient_states,
+                                         absorbing_states, y)
+
+    return to_simplest_form(numerators, common_denominator)
+# End of crt_solution()
+
+
+# Factorizations of (I - Q) by transient block, least recently used first
+FACTORIZATION_CACHE = OrderedDict()
+FACTORIZATION_CACHE_SIZE = 32
+
+
+def split_transition_matrix(transition_matrix):
+    """
+    Return (Q, R) of a matrix of counts as Fractions, with the transient and
+    absorbing states in their original order, as in get_probabilities_list().
+    """
+
+    transient_states, absorbing_states = split_states(transition_matrix)
+
+    return get_Q_and_R(transition_matrix, transient_states, absorbing_states)
+# End of split_transition_matrix()
+
+
+def lu_decompose(A):
+    """
+    Return (permutation, L, U) with A[permutation[i]] = (L*U)[i], L being
+    unit lower triangular (its diagonal isn't stored), using Fractions.
+    """
+
+    order = len(A)
+    U = [[Fraction(value) for value in row] for row in A]
+    L = [[Fraction(0)] * order for _ in range(order)]
+    permutation = range(order)
+
+    for i in range(order):
+        # Get a non-zero pivot, swapping rows if needed.
+        for row in range(i, order):
+            if U[row][i] != 0:
+                break
+        else:  # If no break
+            raise RuntimeError("The matrix couldn't be inverted.")
+
+        if row != i:
+            U[i], U[row] = U[row], U[i]
+            L[i], L[row] = L[row], L[i]
+            permutation[i], permutation[row] = permutation[row], permutation[i]
+
+        # Make all entries below the pivot zero, remembering the multiples.
+        for row in range(i+1, order):
+            multiple = U[row][i] / U[i][i]
+            if multiple:
+                L[row][i] = multiple
+                for col in range(i, order):
+                    U[row][col] -= multiple * U[i][col]
+
+    return permutation, L, U
+# End of lu_decompose()
+
+
+def lu_solve(factorization, b):
+    """Solve A x = b with forward and back substitution on A's LU."""
+
+    permutation, L, U = factorization
+    order = len(b)
+
+    # Forward substitution, L y = P b
+    y = []
+    for i in range(order):
+        y.append(b[permutation[i]]
+                 - sum(L[i][j] * y[j] for j in range(i) if L[i][j]))
+
+    # Back substitution, U x = y
+    x = [0] * order
+    for i in range(order-1, -1, -1):
+        x[i] = (y[i] - sum(U[i][j] * x[j] for j in range(i+1, order)
+                           if U[i][j])) / U[i][i]
+
+    return x
+# End of lu_solve()
+
+
+class PreparedChain(object):
+    """
+    (I - Q) of a transient block Q factored once, to answer the absorption
+    probabilities for any exit weights R (t x s), from every start state,
+    with just forward and back substitution.
+
+    The factorizations are kept in a bounded cache (FACTORIZATION_CACHE)
+    keyed by the transient block, so preparing the same Q again is free.
+    """
+
+    def __init__(self, Q):
+        key = tuple(tuple(Fraction(value) for value in row) for row in Q)
+
+        if key in FACTORIZATION_CACHE:
+            self.factorization = FACTORIZATION_CACHE.pop(key)
+        else:
+            I_minus_Q = subtract_matrices(get_identity_matrix(len(Q)),
+                                          [list(row) for row in key])
+            self.factorization = lu_decompose(I_minus_Q)
+
+        # Most recently used at the end; evict from the front
+        FACTORIZATION_CACHE[key] = self.factorization
+        while len(FACTORIZATION_CACHE) > FACTORIZATION_CACHE_SIZE:
+            FACTORIZATION_CACHE.popitem(last=False)
+    # End of __init__()
+
+    def absorption_probabilities(self, R):
+        """Return N*R, i.e. row i is the probabilities from start state i."""
+
+        columns = [lu_solve(self.factorization,
+                            [Fraction(value) for value in column])
+                   for column in transpose(R)]
+
+        return transpose(columns)
+    # End of absorption_probabilities()
+
+    def solution(self, R, start_state=0):
+        """
+        Return [numerators..., denominator] like solution(), but for any
+        transient start state (an index into the rows of Q).
+        """
+
+        # Only one row of N*R is needed, so solve (I - Q)^T instead:
+        # x = e_start * N * R = ((I - Q)^-T e_start)^T * R, and with
+        # (I - Q) = P^T L U that's U^T L^T P, i.e. substitutions again.
+        permutation, L, U = self.factorization
+        order = len(U)
+
+        # Forward substitution, U^T w = e_start
+        w = []
+        for i in range(order):
+            w.append((int(i == start_state)
+                      - sum(U[j][i] * w[j] for j in range(i) if U[j][i]))
+                     / U[i][i])
+
+        # Back substitution, L^T v = w (L has a unit diagonal)
+        v = [0] * order
+        for i in range(order-1, -1, -1):
+            v[i] = w[i] - sum(L[j][i] * v[j] for j in range(i+1, order)
+                              if L[j][i])
+
+        # y = P^T v
+        y = [0] * order
+        for i, original_row in enumerate(permutation):
+            y[original_row] = v[i]
+
+        probabilities = [sum(y_i * Fraction(row[j]) for y_i, row in zip(y, R))
+                         for j in range(len(R[0]))]
+
+        return to_common_denominator(probabilities)
+    # End of solution()
+# End of PreparedChain
+
+
+# Doubles have ~16 digits, so fractions with bigger denominators than this
+# can't be told apart from their neighbours
+MAX_FLOAT_DENOMINATOR = 10**7
+
+
+def guess_fractions(values, bound):
+    """
+    Return the closest Fractions to floats with denominators up to a bound,
+    and up to MAX_FLOAT_DENOMINATOR.
+    """
+
+    max_denominator = max(1, min(bound, MAX_FLOAT_DENOMINATOR))
+    return [Fraction(value).limit_denominator(max_denominator)
+            for value in values]
+# End of guess_fractions()
+
+
+def float_solution(transition_matrix):
+    """
+    Same as solution(), solving the system of fraction_free_solution() with
+    NumPy (LAPACK) floats first.
+
+    The exact rationals are guessed from the floats, with the denominators
+    bounded by Hadamard's bound on the determinant (which every denominator
+    divides), and certified by substituting them back into the integer
+    system. Only when that fails (or without NumPy) is the exact solver run.
+
+    Doubles only tell apart denominators up to MAX_FLOAT_DENOMINATOR, and
+    once Hadamard's bound is past its square the determinant almost always
+    is too (17 of 225 random chains still certified), so those go straight
+    to the exact solver instead of paying for both. That leaves the float
+    path to small chains, or ones with few and small counts.
+    """
+
+    transient_states, absorbing_states = split_states(transition_matrix)
+
+    # If state 0 is terminal, it will stay there.
+    if transient_states[:1] != [0]:
+        return [int(state == 0) for state in absorbing_states] + [1]
+
+    if numpy is None:
+        return fraction_free_solution(transition_matrix)
+
+    A_transpose, e_0 = get_fraction_free_system(transition_matrix,
+                                                transient_states)
+
+    hadamard_bound = get_hadamard_bound(A_transpose)
+    if hadamard_bound > MAX_FLOAT_DENOMINATOR**2:
+        return fraction_free_solution(transition_matrix)
+
+    try:
+        y_float = numpy.linalg.solve(numpy.array(A_transpose, dtype=float),
+                                     numpy.array(e_0, dtype=float))
+    except numpy.linalg.LinAlgError:
+        return fraction_free_solution(transition_matrix)
+
+    if not numpy.all(numpy.isfinite(y_float)):
+        return fraction_free_solution(transition_matrix)
+
+    candidate = guess_fractions(y_float.tolist(), hadamard_bound)
+
+    certified = certify_candidate(A_transpose, e_0, candidate)
+    if not certified:
+        return fraction_free_solution(transition_matrix)
+
+    y, common_denominator = certified
+
+    numerators = get_absorbed_numerators(transition_matrix, transient_states,
+                                         absorbing_states, y)
+
+    return to_simplest_form(numerators, common_denominator)
+# End of float_solution()
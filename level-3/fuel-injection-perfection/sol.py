@@ -1,3 +1,25 @@
+import os
+import sys
+
+
+# decimal_conversion.py is at the root of the repo, see its docstring.
+repo_root = os.path.normpath(os.path.join(os.path.dirname(
+    os.path.abspath(__file__)), os.pardir, os.pardir))
+
+# Only put it on sys.path (and take it off) if it isn't there already
+on_path = repo_root in sys.path
+if not on_path:
+    sys.path.append(repo_root)
+try:
+    from decimal_conversion import str_to_int
+except ImportError:
+    str_to_int = long
+finally:
+    if not on_path:
+        sys.path.remove(repo_root)
+    del repo_root, on_path
+
+
 def solution(pellets):
     # Convert from string
     pellets = long(pellets)
@@ -38,3 +60,115 @@ def solution(pellets):
 
     return number_of_operations
 # End of solution()
+
+
+def non_adjacent_form(pellets):
+    """
+    Return (positive, negative) for an int pellets >= 1, with the +1 and -1
+    digits of its non-adjacent form as the set bits, i.e.
+
+        pellets = positive - negative
+    """
+
+    if pellets < 1:
+        raise ValueError("There must be at least 1 pellet.")
+
+    half = pellets >> 1
+    three_halves = pellets + half
+    carries = half ^ three_halves
+
+    return three_halves & carries, half & carries
+# End of non_adjacent_form()
+
+
+def count_operations(pellets):
+    """
+    Return the number of operations solution() takes for an int pellets >= 1,
+    in a constant number of operations on the whole number.
+
+    Going from the least significant bit up, solution() halves on a 0 and
+    on an odd number it takes -1 if the next bit is 0 (x % 4 == 1) and +1 if
+    it's 1 (x % 4 == 3), carrying into the bits above, i.e. over a run of 1s.
+    That's exactly the carry state machine that builds the non-adjacent form
+    (NAF) of pellets, with digits in {-1, 0, 1} and no two adjacent non-zero
+    ones. The carries of pellets + pellets/2 compute all of it at once:
+
+        pellets = positive - negative, with the NAF digits as bits of these
+
+    Every non-zero digit but the leading one is a -1 or +1 operation, and
+    every position below the leading one is a halving. The exception is 3,
+    where solution() goes 3 -> 2 -> 1 instead of 3 -> 4 -> 2 -> 1, saving an
+    operation; it is reached iff the NAF starts with 1, 0, -1.
+    """
+
+    positive, negative = non_adjacent_form(pellets)
+
+    top = positive.bit_length() - 1  # The leading digit is always positive
+    non_zero = bin(positive).count("1") + bin(negative).count("1")
+
+    number_of_operations = top + non_zero - 1
+
+    # The special case for 3
+    if top >= 2 and (negative >> (top - 2)) & 1:
+        number_of_operations -= 1
+
+    return number_of_operations
+# End of count_operations()
+
+
+def bit_scan_solution(pellets):
+    """Same as solution(), in linear time for any number of digits."""
+    return count_operations(str_to_int(pellets))
+# End of bit_scan_solution()
+
+
+def bit_scan_solutions(pellets_list):
+    """Return bit_scan_solution() for each of pellets_list, in order."""
+    return [bit_scan_solution(pellets) for pellets in pellets_list]
+# End of bit_scan_solutions()
+
+
+def operation_runs(pellets):
+    """
+    Yield the operations solution() takes, run length encoded as (operation,
+    repeat) pairs, where operation is "+1", "-1" or "/2".
+
+    It's lazy, and it keeps just the digits of the NAF (see count_operations())
+    around, as strings, not the steps.  Each non-zero digit is a +1 or -1,
+    and is followed by a run of halvings up to the next one.
+    """
+
+    pellets = str_to_int(pellets)
+    positive, negative = non_adjacent_form(pellets)
+
+    top = positive.bit_length() - 1
+    width = top + 1
+
+    # Most significant digit first, so position i is at index top - i
+    digits = bin(positive | negative)[2:]
+    negative_digits = bin(negative)[2:].zfill(width)
+
+    # The special case for 3, see count_operations()
+    three_at = top - 2 if top >= 2 and negative_digits[2] == "1" else None
+
+    position = 0  # The halvings are counted from here
+    search = 0  # The next non-zero digit is at this position or above
+
+    while True:
+        index = digits.rfind("1", 0, top - search + 1)
+        next_position = top - index
+
+        if next_position > position:
+            yield "/2", next_position - position
+
+        if next_position == top:
+            return
+
+        if next_position == three_at:
+            yield "-1", 1
+            yield "/2", 1
+            return
+
+        yield ("+1" if negative_digits[index] == "1" else "-1"), 1
+        position, search = next_position, next_position + 1
+# End of operation_runs()
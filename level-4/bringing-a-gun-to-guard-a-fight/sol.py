@@ -1,39 +1,24 @@
-from math import ceil, hypot, log
+from bisect import bisect_left, bisect_right
+from fractions import gcd
+from itertools import chain
+from math import hypot, sqrt
 
+try:
+    import numpy
+except ImportError:  # The vectorized backend is optional (foobar lacks it)
+    numpy = None
 
-def in_same_quadrant(point1, point2):
-    """Return if two points are in same quadrant"""
 
-    # Same sign (0 doesn't have any sign)
-    return ((point1[0] == 0 or point1[0] ^ point2[0] >= 0)
-            and (point1[1] == 0 or point1[1] ^ point2[1] >= 0))
-# End of in_same_quadrant()
-
-
-def point_encountered_earlier(point1, point2):
+def get_direction(point):
     """
-    If x2 > x1 or y2 > y1, then the other point isn't in the way.
-    Since we are seeing from origin (0, 0) as the pos. of shooter, points
-    must be in same quadrant to be in the way.
-
-    This function should be called when slope associated with the points are
-    the same, as such it is then sufficient to just check the values of points.
+    Return the direction of a point (from (0, 0)) as a primitive integer
+    vector, e.g. (4, -6) -> (2, -3), so that points on the same ray (and only
+    those) share the same direction, without any float slopes.
     """
 
-    return abs(point1[0]) < abs(point2[0]) or abs(point1[1]) < abs(point2[1])
-# End of point_encountered_earlier()
-
-
-def get_slope(point):
-    """Return slope of a point/position."""
-
-    if point[0] != 0:
-        return float(point[1]) / point[0]
-    elif point[1] > 0:
-        return "+infinity"
-    else:
-        return "-infinity"
-# End of get_slope()
+    divisor = abs(gcd(point[0], point[1]))
+    return point[0] // divisor, point[1] // divisor
+# End of get_direction()
 
 
 def distance_formula(position_1, position_2):
@@ -47,180 +32,116 @@ def distance_formula(position_1, position_2):
 # End of distance_formula
 
 
-def mirror_horizontally(positions, c):
-    """
-    Mirror points w.r.t. x = c line.
-    Reflection of (x, y) due to x = c would be (2c-x, y).
-    """
-
-    for index in range(len(positions)):
-        i, j = positions[index]
-        p = 2*c - i
-        q = j
-        positions.append((p, q))
-# End of mirror_horizontally()
+def integer_sqrt(n):
+    """Return floor(sqrt(n)) for a non-negative integer, without floats."""
 
+    if n < 2:
+        return n
 
-def mirror_vertically(positions, c):
-    """
-    Mirror points w.r.t. y = c line.
-    Reflection of (x, y) due to y = c would be (x, 2c-y).
-    """
+    # Newton's method, starting from a power of 2 above the root
+    root = 1 << ((n.bit_length() + 1) // 2)
 
-    for index in range(len(positions)):
-        i, j = positions[index]
-        p = i
-        q = 2*c - j
-        positions.append((p, q))
-# End of mirror_vertically()
+    while True:
+        next_root = (root + n // root) // 2
+        if next_root >= root:
+            return root
+        root = next_root
+# End of integer_sqrt()
 
 
-def mirror_coordinates(
-    dimensions, my_positions, guard_positions, corners,
-    max_x_mirrors, max_y_mirrors
-):
+def reflect_coordinate(tile, size, coordinate):
     """
-    Mirror the coordinates.
-    We can mirror it rightwards first, then mirror it upwards.
-    Then we can mirror the whole thing to left and downwards.
-    It's kind of like unfolding a folded paper.
-    Will probably have more mirrors than required.
-    """
-
-    corner_x, corner_y = corners[-1]  # First top-right corner
-
-    # The next corner (or the line actually) will be at an increased value.
-    # So we will just multiply the respective dimension of the room.
-    x_dim, y_dim = dimensions
-
-    # The last corner will be at 2^(iteration - 1) times the offset.
-    mirror_count_x = mirror_count_y = 0  # No. of times mirroring/iter happens
-
-    # Log base 2 since each iteration mirrors all the previous ones.
-    max_iter_x = ceil(log(max_x_mirrors, 2))
-    max_iter_y = ceil(log(max_y_mirrors, 2))
-
-    # Number of iterations must be sufficient to generate the mirrors
-    max_iter_x += 0 if 2**max_iter_x > max_x_mirrors else 1
-    max_iter_y += 0 if 2**max_iter_y > max_y_mirrors else 1
-
-    # Mirroring to right first. Thus, x = corner_x
-    while mirror_count_x < max_iter_x:
-        mirror_horizontally(my_positions, corner_x)
-        mirror_horizontally(guard_positions, corner_x)
-        corner_x += (2**mirror_count_x) * x_dim
-        mirror_count_x += 1
-    mirror_horizontally(my_positions, x_dim+5)
-
-    # Now mirroring upwards. Thus, y = corner_y
-    while mirror_count_y < max_iter_y:
-        mirror_vertically(my_positions, corner_y)
-        mirror_vertically(guard_positions, corner_y)
-        corner_y += (2**mirror_count_y) * y_dim
-        mirror_count_y += 1
-
-    # We have made, sort of, the first quadrant (not exactly but ok)
-    # Now we just need to mirror it to left and down to get the full mirror
-    # Will have extra mirrors
-
-    corner_x, corner_y = corners[0]  # Bottom-left corner
-
-    # Mirror towards left
-    mirror_horizontally(my_positions, corner_x)
-    mirror_horizontally(guard_positions, corner_x)
+    Return the coordinate of a point in the given tile of the mirrored rooms.
 
-    # Mirror downwards
-    mirror_vertically(my_positions, corner_y)
-    mirror_vertically(guard_positions, corner_y)
-# End of mirror_coordinates()
+    Unfolding the room like a paper, tile 0 is the room itself, and every odd
+    tile is a mirror image, e.g. with size = 5 and coordinate = 1:
 
-
-def change_frame_of_ref(dimensions, my_positions, guard_positions, corners):
+        tile:   -2  -1   0   1   2
+        coord:  -9  -1   1   9  11
     """
-    Change the frame of reference and make (0, 0) as my_position.
-    Also change the dimensions to reflect the current change by showing both
-        - left and right distances
-        - down and up distances
-    from my_position to the wall.
-
-    For eg., we have been given:
-        - dimensions = [5, 4]
-        - my_positions = [2, 3]
-        - guard_positions = [1, 2]
-        - corners = []
 
-    The following is the room (m = me, g = guard, * = corners of room)
+    if tile % 2 == 0:
+        return tile*size + coordinate
+    else:
+        return tile*size + size - coordinate
+# End of reflect_coordinate()
 
-    4 * . . . . *
-    3 . . m . . .
-    2 . g . . . .
-    1 . . . . . .
-    0 * . . . . *
-      0 1 2 3 4 5
 
-    After changing frame of reference, we will have:
-        - dimensions = [5, 4]  (No change)
-        - my_positions = [(0, 0)]  (List of tuples)
-        - guard_positions = [(2, 0)]
-        - corners = [(-2, -3), (-2, 1), (3, -3), (3, 1)]
+def reflected_images(dimensions, position, my_position, distance,
+                     min_distance=None):
     """
+    Yield every reflected image (x, y) of position which lies within distance
+    of my_position, with my_position as (0, 0), i.e. the frame of reference.
+    With min_distance, only images farther than that (a ring) are yielded.
 
-    # Set corners
-    for x in (0, dimensions[0]):
-        for y in (0, dimensions[1]):
-            corners.append((x - my_positions[0], y - my_positions[1]))
-
-    # Change position vector of guard_position with my_position as reference
-    # List of lists, to store other positions later
-    guard_positions[0] -= my_positions[0]
-    guard_positions[1] -= my_positions[1]
-    guard_positions.append(tuple(guard_positions))
-    del guard_positions[0]  # Remove the first two elements, i.e., the flow is
-    del guard_positions[0]  # from [1, 2] to [1, 2, (2, 0)] to [(2, 0)]
-
-    # Set as [(0, 0)]
-    my_positions.append((0, 0))
-    del my_positions[0]
-    del my_positions[0]
-# End of change_frame_of_ref()
-
-
-def convert_to_slopes_dict(positions, distance):
+    The tiles are computed directly from the distance circle, so no image
+    outside of it is ever made, and x^2 + y^2 <= distance^2 is checked with
+    ints instead of hypot().
     """
-    Make dict with slope (from (0, 0)) as key & set of points as value.
-
-    If a position is encountered earlier, use that position, since the latter
-    positions are immaterial for our purposes.
 
-    If the distance to a point is greater than the maximum distance a beam can
-    travel, then it is of no use too.
+    x_dim, y_dim = dimensions
+    my_y = my_position[1]
+    distance_squared = distance * distance
+    min_distance_squared = -1 if min_distance is None else min_distance**2
+
+    # Tiles whose x range overlaps [my_x - distance, my_x + distance]
+    for tile_x in range((my_position[0] - distance) // x_dim,
+                        (my_position[0] + distance) // x_dim + 1):
+        x = reflect_coordinate(tile_x, x_dim, position[0]) - my_position[0]
+
+        if x * x > distance_squared:
+            continue
+
+        # The circle is only this high (and low) at this x
+        y_reach = integer_sqrt(distance_squared - x * x)
+        tiles_y = range((my_y - y_reach) // y_dim,
+                        (my_y + y_reach) // y_dim + 1)
+
+        if x * x < min_distance_squared:
+            # Skip the tiles which are wholly within the inner circle
+            y_inner = integer_sqrt(min_distance_squared - x * x)
+            last_low_tile = (my_y - y_inner) // y_dim
+            tiles_y = chain(
+                range(tiles_y[0], last_low_tile + 1),
+                range(max(last_low_tile + 1, (my_y + y_inner) // y_dim),
+                      tiles_y[-1] + 1)
+            )
+
+        for tile_y in tiles_y:
+            y = reflect_coordinate(tile_y, y_dim, position[1]) - my_y
+
+            if min_distance_squared < x * x + y * y <= distance_squared:
+                yield x, y
+# End of reflected_images()
+
+
+def nearest_per_direction(my_positions, guard_positions):
     """
+    Make dict with direction (from (0, 0)) as key & (distance squared, whether
+    it's a guard) of the nearest position in that direction as value.
 
-    slopes_dict = {}
-
-    for pos in positions:
+    If a position is encountered earlier, use that position, since the beam
+    stops there, and the latter positions are immaterial for our purposes.
+    Positions can come in any order, each one is looked at only once.
+    """
 
-        # Distance formula but with origin is just sqrt(x^2 + y^2)
-        if hypot(pos[0], pos[1]) > distance:
-            continue  # Skip this positions
+    nearest = {}
 
-        slope = get_slope(pos)
+    for is_guard, positions in ((False, my_positions),
+                                (True, guard_positions)):
+        for pos in positions:
+            direction = get_direction(pos)
+            distance_squared = pos[0]*pos[0] + pos[1]*pos[1]
 
-        if slope in slopes_dict:
-            for existing_pos in slopes_dict[slope]:
-                if in_same_quadrant(existing_pos, pos):
-                    if point_encountered_earlier(existing_pos, pos):
-                        break
-            else:  # If no break
-                slopes_dict[slope].add(pos)
-        else:
-            slopes_dict[slope] = {pos}
+            if (direction not in nearest
+                    or distance_squared < nearest[direction][0]):
+                nearest[direction] = (distance_squared, is_guard)
 
-    return slopes_dict
-# End of convert_to_slopes_dict()
+    return nearest
+# End of nearest_per_direction()
 
 
-def num_killable_positions(my_positions, guard_positions, distance):
+def num_killable_positions(nearest):
     """
     Returns number of killable positions. Position we cannot hit occurs when:
         - A killable guard position already exists before that position,
@@ -228,40 +149,19 @@ def num_killable_positions(my_positions, guard_positions, distance):
         - We hit ourselves first before the guard,
         - We hit a corner, due to which the beam bounces back towards us.
 
-    The first and second case is taken care of by convert_to_slopes_dict().
-    The third case is a subset of the second case.
+    The second case is taken care of by reflected_images(), and the first and
+    third case by nearest_per_direction(), as my images are in there too.
 
-    So we just need to check for the second case now.
-    """
+    The fourth case is the third case in disguise: a beam bouncing back from a
+    corner c is a straight line through c in the mirrored rooms, and it hits
+    my image at 2c (the room mirrored in both walls) right where the real beam
+    would hit me. Anything between c and 2c on that line mirrors something
+    between me and c, which was hit (or not) on the way to the corner.
 
-    killable_positions = 0  # Number of valid postions
-
-    # If a slope (& hence line y = mx) isn't there in my_positions,
-    # all the points associated with that slope are valid.
-    for slope in guard_positions.keys():
-        if slope not in my_positions:
-            killable_positions += len(guard_positions[slope])
-            del guard_positions[slope]
-
-    while guard_positions:
-        # Get a slope, and points corresponding to it
-        guard_slope, positions = guard_positions.popitem()
-
-        for guard in positions:
-
-            found_closer_position = False
-
-            # Slopes which weren't there in my_positions are already removed.
-            for pos in my_positions[guard_slope]:
-                if in_same_quadrant(pos, guard):
-                    if point_encountered_earlier(pos, guard):
-                        found_closer_position = True
-                        break
-
-            if not found_closer_position:  # If we don't hit ourselves first
-                killable_positions += 1
+    So we just need to count the directions where a guard is the nearest.
+    """
 
-    return killable_positions
+    return sum(1 for _, is_guard in nearest.values() if is_guard)
 # End of num_killable_positions()
 
 
@@ -304,30 +204,450 @@ def solution(dimensions, my_position, guard_position, distance):
         # The shortest path is the max distance the beam can travel.
         return 1
 
-    # Number of max mirrors of the room in both (positive) directions
+    # We don't need to mirror every point on room.
+    # We are only concerned with our position and the guard's position.
+    # Both are generators, with my_position as the frame of reference (0, 0)
+    my_positions = (position for position in reflected_images(
+        dimensions, my_position, my_position, distance
+    ) if position != (0, 0))  # Our reference/start point isn't an image
+    guard_positions = reflected_images(dimensions, guard_position,
+                                       my_position, distance)
+
+    # Convert to a dict with directions as key for faster evaluation later
+    nearest = nearest_per_direction(my_positions, guard_positions)
+
+    # Return in how many directions we can shoot to kill
+    return num_killable_positions(nearest)
+# End of solution()
+
+
+class PreparedRoom(object):
+    """
+    My reflected images and their direction index for one room, my position
+    and distance, computed once to answer solution() for many guards; every
+    query then only pays for the guard's images.
+    """
+
+    def __init__(self, dimensions, my_position, distance):
+        self.dimensions = dimensions
+        self.my_position = my_position
+        self.distance = distance
+
+        my_positions = (position for position in reflected_images(
+            dimensions, my_position, my_position, distance
+        ) if position != (0, 0))  # Our reference/start point isn't an image
+
+        # direction -> distance squared of my nearest image in that direction
+        self.my_nearest = dict(
+            (direction, distance_squared) for direction, (distance_squared, _)
+            in nearest_per_direction(my_positions, ()).items()
+        )
+    # End of __init__()
+
+    def solution(self, guard_position):
+        """Return the number of directions to fire to hit this guard."""
+
+        if list(self.my_position) == list(guard_position):
+            raise ValueError("Both persons cannot be at the same position.")
+
+        guard_nearest = nearest_per_direction((), reflected_images(
+            self.dimensions, guard_position, self.my_position, self.distance
+        ))
+
+        # Killable if I'm not in the way (no image or a farther one)
+        my_nearest = self.my_nearest
+        return sum(1 for direction, (distance_squared, _)
+                   in guard_nearest.items()
+                   if distance_squared < my_nearest.get(direction,
+                                                        distance_squared + 1))
+    # End of solution()
+
+    def solutions(self, guard_positions):
+        """Yield solution() for each of a stream of guard positions."""
+
+        for guard_position in guard_positions:
+            yield self.solution(guard_position)
+    # End of solutions()
+# End of PreparedRoom
+
+
+def sweep_solution(dimensions, my_position, guard_position, max_distance):
+    """
+    Return solution() for every distance up to max_distance at once, as the
+    steps of the count: a list of (distance squared, count) pairs, one for
+    each distance at which the count changes (see count_at_distance()).
+
+    The nearest position in a direction never changes once it's within the
+    beam's reach, so going through the images in increasing distance, each
+    direction is settled by the first image in it, and the count goes up by
+    one whenever that's a guard. This costs about as much as one solve.
+    """
+
+    if list(my_position) == list(guard_position):
+        raise ValueError("Both persons cannot be at the same position.")
+
+    images = [(pos[0]*pos[0] + pos[1]*pos[1], False, pos)
+              for pos in reflected_images(dimensions, my_position, my_position,
+                                          max_distance)
+              if pos != (0, 0)]  # Our reference/start point isn't an image
+    images.extend((pos[0]*pos[0] + pos[1]*pos[1], True, pos)
+                  for pos in reflected_images(dimensions, guard_position,
+                                              my_position, max_distance))
+    images.sort()
+
+    settled_directions = set()
+    steps = []
+    count = 0
+
+    for distance_squared, is_guard, pos in images:
+        direction = get_direction(pos)
+
+        if direction in settled_directions:
+            continue  # Something nearer is in the way
+
+        settled_directions.add(direction)
+
+        if is_guard:
+            count += 1
+
+            # Images at the same distance change the count in one step
+            if steps and steps[-1][0] == distance_squared:
+                steps[-1] = (distance_squared, count)
+            else:
+                steps.append((distance_squared, count))
+
+    return steps
+# End of sweep_solution()
+
+
+def count_at_distance(steps, distance):
+    """Return the count for a distance from the steps of sweep_solution()."""
+
+    # Last step within reach, i.e. with distance squared <= distance^2
+    index = bisect_right(steps, (distance * distance, float("inf")))
+    return steps[index - 1][1] if index else 0
+# End of count_at_distance()
+
+
+def is_image(point, dimensions, position, my_position):
+    """
+    Return if point (with my_position as (0, 0)) is a reflected image of
+    position. Along an axis, the images repeat every 2 rooms, at position and
+    at its reflection, i.e. at +position and -position modulo 2*size.
+    """
+
+    for axis in range(2):
+        size = dimensions[axis]
+        coordinate = (point[axis] + my_position[axis]) % (2 * size)
+
+        if coordinate not in (position[axis], 2*size - position[axis]):
+            return False
+
+    return True
+# End of is_image()
+
+
+def firing_directions(dimensions, my_position, guard_position, distance,
+                      band_width=None):
+    """
+    Lazily yield (direction, hit distance) for every direction which hits the
+    guard, nearest first, with direction as a primitive integer vector.
+
+    The disk is gone through in rings of band_width (the larger room dimension
+    by default), and only the guard's images in the current ring are kept.
+    Instead of remembering every direction seen so far, an image g times its
+    direction away is in the clear if none of the g - 1 points before it on
+    the ray is an image of me or of the guard, which is_image() tells in O(1).
+    """
+
+    if list(my_position) == list(guard_position):
+        raise ValueError("Both persons cannot be at the same position.")
+
+    band_width = band_width or max(dimensions)
+    inner = None  # The first ring is a disk
+
+    while inner is None or inner < distance:
+        outer = min(distance, (inner or 0) + band_width)
+
+        guard_positions = sorted(
+            reflected_images(dimensions, guard_position, my_position, outer,
+                             inner),
+            key=lambda pos: pos[0]*pos[0] + pos[1]*pos[1]
+        )
+
+        for pos in guard_positions:
+            divisor = abs(gcd(pos[0], pos[1]))
+            direction = pos[0] // divisor, pos[1] // divisor
+
+            # Something nearer on the ray is in the way (the beam stops there)
+            if any(is_image((k*direction[0], k*direction[1]), dimensions,
+                            person, my_position)
+                   for k in range(1, divisor)
+                   for person in (my_position, guard_position)):
+                continue
+
+            # sqrt() of the exact int, so that equal distances stay equal
+            yield direction, sqrt(pos[0]*pos[0] + pos[1]*pos[1])
+
+        inner = outer
+# End of firing_directions()
+
+
+# The four cones (p > 0 and -p < q <= p) which partition the plane, as the
+# (axis, sign) of the primary coordinate p and the secondary coordinate q.
+# Each one is the one before rotated by 90 degrees: right, up, left, down.
+CONES = (((0, 1), (1, 1)), ((1, 1), (0, -1)),
+         ((0, -1), (1, -1)), ((1, -1), (0, 1)))
+
+
+def reflected_coordinates(size, coordinate, my_coordinate, distance):
+    """
+    reflect_coordinate() for every tile along one axis within distance,
+    relative to my_coordinate. Returns a sorted list.
+    """
+
+    coordinates = [
+        reflect_coordinate(tile, size, coordinate) - my_coordinate
+        for tile in range((my_coordinate - distance) // size,
+                          (my_coordinate + distance) // size + 1)
+    ]
+
+    return sorted(c for c in coordinates if abs(c) <= distance)
+# End of reflected_coordinates()
+
+
+def sector_images(dimensions, position, my_position, distance, sector):
+    """
+    Yield the reflected images (p, q) of position within distance whose
+    direction lies in the sector, i.e. lower < q/p <= upper in a cone.
+
+    sector is (cone, (lower_num, lower_den), (upper_num, upper_den)), with the
+    bounds in [-1, 1]. Images are in the cone's rotated frame, which doesn't
+    matter since a rotation maps directions one to one.
+    """
+
+    cone, (lower_num, lower_den), (upper_num, upper_den) = sector
+    (p_axis, p_sign), (q_axis, q_sign) = CONES[cone]
+
+    axes = [reflected_coordinates(dimensions[axis], position[axis],
+                                  my_position[axis], distance)
+            for axis in range(2)]
+
+    primaries = [p_sign * c for c in axes[p_axis] if p_sign * c > 0]
+    secondaries = sorted(q_sign * c for c in axes[q_axis])
+
+    distance_squared = distance * distance
+
+    for p in primaries:
+        y_reach = integer_sqrt(distance_squared - p * p)
+
+        # lower*p < q <= upper*p, with floor division keeping it exact
+        q_min = max(lower_num * p // lower_den + 1, -y_reach)
+        q_max = min(upper_num * p // upper_den, y_reach)
+
+        for index in range(bisect_left(secondaries, q_min),
+                           bisect_right(secondaries, q_max)):
+            yield p, secondaries[index]
+# End of sector_images()
+
+
+def count_sector(args):
+    """Number of killable positions in one sector (run in a worker)."""
+
+    dimensions, my_position, guard_position, distance, sector = args
+
+    nearest = nearest_per_direction(
+        sector_images(dimensions, my_position, my_position, distance, sector),
+        sector_images(dimensions, guard_position, my_position, distance,
+                      sector)
+    )
+
+    return num_killable_positions(nearest)
+# End of count_sector()
+
+
+def get_sectors(sectors_per_cone):
+    """
+    Split every cone into sectors_per_cone sectors with bounds evenly spaced
+    in q/p, i.e. (-1, -1 + 2/n], (-1 + 2/n, -1 + 4/n], ... (1 - 2/n, 1].
+    """
+
+    n = sectors_per_cone
+    return [(cone, (2*k - n, n), (2*(k + 1) - n, n))
+            for cone in range(len(CONES)) for k in range(n)]
+# End of get_sectors()
+
+
+def parallel_solution(dimensions, my_position, guard_position, distance,
+                      processes=None, sectors_per_process=8):
+    """
+    Same as solution(), but with the image plane split into sectors of
+    directions, which are counted independently in a process pool, since the
+    nearest position per direction never depends on another direction.
+
+    Every worker only makes the images of its own sector. There are a few
+    sectors per process, as they aren't equally costly.
+    """
+
+    if list(my_position) == list(guard_position):
+        raise ValueError("Both persons cannot be at the same position.")
+
+    # Not at the top, foobar blocks the thread module multiprocessing uses
+    from multiprocessing import Pool, cpu_count
+
+    processes = processes or cpu_count()
+
     # ceil(a/b) = (a+b-1)/b
-    max_x_mirrors = (distance + dimensions[0] - 1) / dimensions[0]
-    max_y_mirrors = (distance + dimensions[1] - 1) / dimensions[1]
+    sectors = get_sectors((sectors_per_process*processes + len(CONES) - 1)
+                          // len(CONES))
 
-    # Plural references to indicate there will be multiple positions later
-    # (Due to mirroring)
-    my_positions, guard_positions, corners = my_position, guard_position, []
+    pool = Pool(processes)
 
-    change_frame_of_ref(dimensions, my_positions, guard_positions, corners)
+    try:
 
-    # We don't need to mirror every point on room.
-    # We are only concerned with our position, the guard's position, & corners.
-    mirror_coordinates(dimensions, my_positions, guard_positions, corners,
-                       max_x_mirrors, max_y_mirrors)
+        counts = pool.imap_unordered(
+            count_sector,
+            [(dimensions, my_position, guard_position, distance, sector)
+             for sector in sectors]
+        )
 
-    # Our reference/start point is (0, 0), so remove it.
-    # It's the first entry due to change_frame_of_ref()
-    del my_positions[0]
+        return sum(counts)
+    finally:
+        pool.close()
+        pool.join()
+# End of parallel_solution()
 
-    # Convert to a dict with slopes as key for faster evaluation later
-    my_positions = convert_to_slopes_dict(my_positions, distance)
-    guard_positions = convert_to_slopes_dict(guard_positions, distance)
 
-    # Return in how many directions we can shoot to kill
-    return num_killable_positions(my_positions, guard_positions, distance)
-# End of solution()
+def reflected_coordinates_array(size, coordinate, my_coordinate, distance):
+    """
+    Vectorized reflect_coordinate() for every tile along one axis within
+    distance, relative to my_coordinate. Returns a sorted int64 array.
+    """
+
+    tiles = numpy.arange((my_coordinate - distance) // size,
+                         (my_coordinate - distance) // size
+                         + 2*distance // size + 2, dtype=numpy.int64)
+
+    coordinates = tiles*size + numpy.where(tiles % 2 == 0, coordinate,
+                                           size - coordinate) - my_coordinate
+
+    return coordinates[numpy.abs(coordinates) <= distance]
+# End of reflected_coordinates_array()
+
+
+def integer_sqrt_array(values):
+    """Vectorized integer_sqrt() for an int64 array (exact up to 2^52)."""
+
+    roots = numpy.floor(numpy.sqrt(values)).astype(numpy.int64)
+
+    # The float root can be one off either way, set it straight
+    roots -= roots*roots > values
+    roots += (roots + 1)*(roots + 1) <= values
+
+    return roots
+# End of integer_sqrt_array()
+
+
+def sector_images_array(axes, distance, sector):
+    """
+    Vectorized sector_images(), from the reflected_coordinates_array() of
+    both axes. Returns int64 arrays (p, q) of the images in the sector.
+    """
+
+    cone, (lower_num, lower_den), (upper_num, upper_den) = sector
+    (p_axis, p_sign), (q_axis, q_sign) = CONES[cone]
+
+    primaries = p_sign * axes[p_axis]
+    primaries = primaries[primaries > 0]
+    secondaries = numpy.sort(q_sign * axes[q_axis])
+
+    y_reach = integer_sqrt_array(distance*distance - primaries*primaries)
+
+    # lower*p < q <= upper*p, with floor division keeping it exact
+    q_min = numpy.maximum(lower_num * primaries // lower_den + 1, -y_reach)
+    q_max = numpy.minimum(upper_num * primaries // upper_den, y_reach)
+
+    first = numpy.searchsorted(secondaries, q_min, side="left")
+    counts = numpy.maximum(
+        numpy.searchsorted(secondaries, q_max, side="right") - first, 0
+    )
+
+    # Every primary with its run secondaries[first:first + count]
+    ends = numpy.cumsum(counts)
+    indices = numpy.arange(ends[-1] if len(ends) else 0, dtype=numpy.int64) \
+        + numpy.repeat(first - (ends - counts), counts)
+
+    return numpy.repeat(primaries, counts), secondaries[indices]
+# End of sector_images_array()
+
+
+def count_nearest_guards(x, y, is_guard, distance):
+    """
+    Vectorized nearest_per_direction() and num_killable_positions().
+
+    Every image is reduced to its primitive direction with a vectorized gcd;
+    the gcd itself is then how many times farther than the direction vector
+    an image is, so sorting by (direction, gcd) puts the nearest image of
+    every direction first.
+    """
+
+    if not len(x):
+        return 0
+
+    divisors = numpy.gcd(x, y)
+    directions_x, directions_y = x // divisors, y // divisors
+
+    # Pack a direction into a single int64 key, both parts are in [-d, d]
+    keys = (directions_x + distance) * (2*distance + 1) \
+        + (directions_y + distance)
+
+    order = numpy.lexsort((divisors, keys))
+    _, first = numpy.unique(keys[order], return_index=True)
+
+    return int(numpy.count_nonzero(is_guard[order[first]]))
+# End of count_nearest_guards()
+
+
+def vectorized_solution(dimensions, my_position, guard_position, distance,
+                        chunk_size=1 << 20):
+    """
+    Same as solution(), but with the images in int64 NumPy arrays, and without
+    foobar's limits on the room dimensions and the distance. Needs NumPy.
+
+    Like parallel_solution(), the plane is split into sectors of directions
+    (get_sectors()), which are counted one at a time, so only the images of
+    one sector, about chunk_size of them, are ever in memory.
+    """
+
+    if numpy is None:
+        raise ImportError("vectorized_solution() needs NumPy.")
+
+    if list(my_position) == list(guard_position):
+        raise ValueError("Both persons cannot be at the same position.")
+
+    my_axes, guard_axes = [
+        [reflected_coordinates_array(dimensions[axis], position[axis],
+                                     my_position[axis], distance)
+         for axis in range(2)]
+        for position in (my_position, guard_position)
+    ]
+
+    # Both persons have about pi*d^2/(w*h) images in the circle
+    images = 2 * 3.15 * distance * distance / (dimensions[0] * dimensions[1])
+    sectors_per_cone = int(images // (len(CONES) * chunk_size)) + 1
+
+    count = 0
+
+    for sector in get_sectors(sectors_per_cone):
+        # Our reference/start point isn't an image, and isn't in any sector
+        my_p, my_q = sector_images_array(my_axes, distance, sector)
+        guard_p, guard_q = sector_images_array(guard_axes, distance, sector)
+
+        p = numpy.concatenate((my_p, guard_p))
+        q = numpy.concatenate((my_q, guard_q))
+        is_guard = numpy.arange(len(p)) >= len(my_p)
+
+        count += count_nearest_guards(p, q, is_guard, distance)
+
+    return count
+# End of vectorized_solution()
@@ -0,0 +1,74 @@
+"""
+Compare the max flow modes of sol.py on random networks.
+
+Run from this directory: python benchmark.py
+"""
+
+import random
+from copy import deepcopy
+from timeit import default_timer
+
+import sol
+
+
+def random_network(num_rooms, density, max_bunnies=2000000, seed=0):
+    """Return a random sq. matrix with about density of the corridors open."""
+
+    generator = random.Random(seed)
+
+    return [[generator.randint(1, max_bunnies)
+             if room != next_room and generator.random() < density else 0
+             for next_room in range(num_rooms)]
+            for room in range(num_rooms)]
+# End of random_network()
+
+
+def time_it(function, *args):
+    """Return (result, seconds) of a single call."""
+
+    start = default_timer()
+    result = function(*args)
+    return result, default_timer() - start
+# End of time_it()
+
+
+def main():
+    modes = [
+        ("solution", lambda e, x, p: sol.solution(e, x, deepcopy(p))),
+        ("sparse", sol.sparse_solution),
+    ]
+
+    if sol.numpy is not None:
+        modes.append(("dense", sol.dense_solution))
+    else:
+        print("NumPy isn't installed, skipping dense_solution().")
+
+    print("%6s %8s  " % ("rooms", "density")
+          + "  ".join("%10s" % name for name, _ in modes))
+
+    for num_rooms, density in [(50, 0.5), (100, 0.5), (200, 0.5),
+                               (200, 0.9), (400, 0.3), (400, 0.9),
+                               (1000, 0.5)]:
+        path = random_network(num_rooms, density)
+        entrances = range(num_rooms / 10)
+        exits = range(num_rooms - num_rooms / 10, num_rooms)
+
+        results, timings = set(), []
+        for name, function in modes:
+            # The classic solution() is way too slow for big networks
+            if name == "solution" and num_rooms > 200:
+                timings.append("%10s" % "-")
+                continue
+
+            result, seconds = time_it(function, entrances, exits, path)
+            results.add(result)
+            timings.append("%9.3fs" % seconds)
+
+        assert len(results) == 1, "Modes disagree: %s" % results
+
+        print("%6d %8.2f  " % (num_rooms, density) + "  ".join(timings))
+# End of main()
+
+
+if __name__ == "__main__":
+    main()
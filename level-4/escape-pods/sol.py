@@ -1,11 +1,29 @@
-from collections import OrderedDict
+from collections import OrderedDict, deque
 from Queue import Queue
 
+try:
+    import numpy
+except ImportError:  # The dense mode is optional (foobar doesn't have it)
+    numpy = None
+
+
+def get_source_bound(network, source):
+    """Return the total outgoing capacity of a source room."""
+    return sum(network[source])
+# End of get_source_bound()
+
+
+def get_sink_bounds(network, sinks):
+    """Return a dict of sink room -> total incoming capacity of that room."""
+    return dict((sink, sum(row[sink] for row in network)) for sink in sinks)
+# End of get_sink_bounds()
+
 
 def convert_to_single_st_problem(network, sources, sinks):
     """
     Convert multiple source and sink problem to single by adding a preceeding
-    source and succeeding sink with infinite (outward and inward) capacities.
+    source and succeeding sink with effectively infinite (outward and inward)
+    capacities.
 
     network is just a sq. matrix (rooms with capacity to another room)
     """
@@ -15,9 +33,14 @@ def convert_to_single_st_problem(network, sources, sinks):
     top_source = [0] + [0] * len_network + [0]
     bottom_sink = [0] + [0] * len_network + [0]
 
+    # A source can't push more than it's corridors allow (and a sink can't take
+    # more than what comes in), so these bounds act as infinity while keeping
+    # all of the residual arithmetic in ints.
+    sink_bounds = get_sink_bounds(network, sinks)
+
     for index in sources:
         # +1 to account for extra top source node
-        top_source[index + 1] = float("inf")
+        top_source[index + 1] = get_source_bound(network, index)
 
     for index in range(len_network):
         # Append the top source
@@ -25,7 +48,7 @@ def convert_to_single_st_problem(network, sources, sinks):
 
         # Append the bottom sink
         if index in sinks:
-            network[index].append(float("inf"))
+            network[index].append(sink_bounds[index])
         else:
             network[index].append(0)
 
@@ -40,7 +63,7 @@ def breadth_first_search(network, source, sink, reversed_path_map):
     Returns a bool indicating if a search was successful or not.
     """
 
-    len_network = sink + 1  # Since sink is the last element
+    len_network = len(network)
 
     visited_rooms = {source}  # A set (we have to just check if we visited)
     next_rooms_queue = Queue()
@@ -69,14 +92,22 @@ def breadth_first_search(network, source, sink, reversed_path_map):
 # End of breadth_first_search()
 
 
-def max_flow_edmonds_karp(network):
-    """Find the maximum flow using Edmonds-Karp algorithm."""
+def max_flow_edmonds_karp(network, source=None, sink=None, limit=None):
+    """
+    Find the maximum flow using Edmonds-Karp algorithm.
+
+    source and sink can be given to push flow between any two rooms of an
+    already used residual network, and limit stops once that much is pushed.
+    """
 
     maximum_flow = 0
 
     # The source and sink is the first and last element due to the use of
     # convert_to_single_st_problem() before calling this
-    source, sink = 0, len(network) - 1
+    if source is None:
+        source = 0
+    if sink is None:
+        sink = len(network) - 1
 
     # For back-tracing back a path; {1: 2, 5: 1} means path is 2 -> 1 -> 5
     # The entries are reversed; as you can see above: 5 <- 1 and 1 <- 2
@@ -85,7 +116,8 @@ def max_flow_edmonds_karp(network):
     # To store valid nodes of the path and to later reduce the flow in that
     augmented_path_map = []
 
-    while breadth_first_search(network, source, sink, reversed_path_map):
+    while (limit is None or maximum_flow < limit) and \
+            breadth_first_search(network, source, sink, reversed_path_map):
 
         # Get the initial values
         current, previous = reversed_path_map.popitem()
@@ -104,6 +136,10 @@ def max_flow_edmonds_karp(network):
 
             augmented_path_map.append((previous, current))
 
+        # Don't push more than what was asked for
+        if limit is not None and flow > limit - maximum_flow:
+            flow = limit - maximum_flow
+
         # Update the flow in the path
         while augmented_path_map:
             room, next_room = augmented_path_map.pop()
@@ -117,8 +153,206 @@ def max_flow_edmonds_karp(network):
 # End of max_flow_edmund_karp()
 
 
-def solution(entrances, exits, path):
-    """This is just an integral multiple source sink maximum flow problem."""
+class IncrementalMaxFlow(object):
+    """
+    Keep the residual network of max_flow_edmonds_karp() around, so that the
+    maximum flow can be repaired after a corridor's capacity changes instead
+    of being solved again from a zero flow.
+
+    The caller's path isn't modified. Room numbers are the same as in path.
+    """
+
+    def __init__(self, entrances, exits, path):
+        self.entrances, self.exits = set(entrances), set(exits)
+        self.capacities = [list(row) for row in path]
+
+        # Residual network with the super source and sink (rooms shift by 1)
+        self.network = [list(row) for row in path]
+        convert_to_single_st_problem(self.network, entrances, exits)
+        self.source, self.sink = 0, len(self.network) - 1
+
+        self.maximum_flow = max_flow_edmonds_karp(self.network)
+    # End of __init__()
+
+    def set_capacity(self, room, next_room, capacity):
+        """
+        Change the capacity of the corridor room -> next_room and return the
+        new maximum flow.
+
+        An increase just opens up the corridor and augments from the current
+        flow. A decrease cancels the flow over the new capacity, tries to
+        reroute it around the corridor, and only sends back to the entrances
+        (and takes back from the exits) what couldn't be rerouted.
+        """
+
+        network = self.network
+        delta = capacity - self.capacities[room][next_room]
+        self.capacities[room][next_room] = capacity
+
+        # A corridor to the same room never carries any flow
+        if room == next_room:
+            network[room + 1][room + 1] += delta
+            return self.maximum_flow
+
+        # +1 to account for extra top source node
+        u, v = room + 1, next_room + 1
+
+        if delta > 0:
+            network[u][v] += delta
+            self._shift_bounds(room, next_room, delta)
+        elif delta < 0:
+            network[u][v] += delta
+
+            # The flow (capacity - residual) can now be over the capacity
+            excess = -network[u][v]
+            if excess > 0:
+                network[u][v] = 0
+                network[v][u] -= excess
+
+                # u is now left with excess bunnies, and v is short of them
+                rerouted = max_flow_edmonds_karp(network, u, v, excess)
+
+                cancelled = excess - rerouted
+                if cancelled:
+                    max_flow_edmonds_karp(network, u, self.source, cancelled)
+                    max_flow_edmonds_karp(network, self.sink, v, cancelled)
+
+            # Bounds can only shrink after the flow through them does
+            self._shift_bounds(room, next_room, delta)
+
+        # Cancelling may have opened up another augmenting path
+        max_flow_edmonds_karp(network)
+
+        # No flow ever leaves the sink, so its residual row is the inflow
+        self.maximum_flow = sum(network[self.sink])
+
+        return self.maximum_flow
+    # End of set_capacity()
+
+    def _shift_bounds(self, room, next_room, delta):
+        """Keep the super source/sink bounds in step with the corridors."""
+
+        if room in self.entrances:
+            self.network[self.source][room + 1] += delta
+
+        if next_room in self.exits:
+            self.network[next_room + 1][self.sink] += delta
+    # End of _shift_bounds()
+# End of IncrementalMaxFlow
+
+
+def breadth_first_search_virtual_st(network, flows, source_bounds,
+                                    sink_bounds, reversed_path_map):
+    """
+    BFS to find the shortest augmenting path from the implicit super source to
+    the implicit super sink, without them (or the residual) being in network.
+
+    flows holds the net flow (room, next_room) -> bunnies, and is
+    antisymmetric, so the residual capacity of a corridor is just
+    network[room][next_room] - flows[(room, next_room)].
+
+    The entrances with leftover source bound are the first rooms of the path
+    and are mapped to None in reversed_path_map.
+    Returns the exit reached, or None if the search was unsuccessful.
+    """
+
+    len_network = len(network)
+
+    next_rooms_queue = deque()
+
+    for room, bound in source_bounds.items():
+        if bound > 0:
+            reversed_path_map[room] = None  # room <- super source
+            next_rooms_queue.append(room)
+
+    while next_rooms_queue:
+        room = next_rooms_queue.popleft()
+
+        # Check if we reached the sink (through this exit)
+        if sink_bounds.get(room, 0) > 0:
+            return room  # Search successful
+
+        row = network[room]
+
+        for next_room in range(len_network):
+            # Check if room already visited
+            if next_room in reversed_path_map:
+                continue
+
+            # Check if residual capacity is greater than 0 so we can flow from
+            if row[next_room] - flows.get((room, next_room), 0) > 0:
+                reversed_path_map[next_room] = room  # next_room <- room
+                next_rooms_queue.append(next_room)
+
+    return None  # Search unsuccessful
+# End of breadth_first_search_virtual_st()
+
+
+def max_flow_virtual_st(network, sources, sinks):
+    """
+    Find the maximum flow using Edmonds-Karp algorithm, but with an implicit
+    super source and sink, so network is neither copied nor modified.
+    """
+
+    maximum_flow = 0
+
+    # Leftover capacity of the super source -> entrance and exit -> super sink
+    # edges, bounded by what the entrances/exits can send/receive at most.
+    source_bounds = dict((room, get_source_bound(network, room))
+                         for room in sources)
+    sink_bounds = get_sink_bounds(network, sinks)
+
+    flows = {}
+
+    while True:
+        reversed_path_map = {}
+
+        exit_room = breadth_first_search_virtual_st(
+            network, flows, source_bounds, sink_bounds, reversed_path_map
+        )
+
+        if exit_room is None:
+            return maximum_flow
+
+        # Trace the path back to the entrance it started from
+        augmented_path_map = []
+        flow = sink_bounds[exit_room]
+
+        current, previous = exit_room, reversed_path_map[exit_room]
+        while previous is not None:
+            residual = network[previous][current] - flows.get((previous,
+                                                               current), 0)
+            # We need the minimum value, due to bottlenecking in the path
+            if residual < flow:
+                flow = residual
+
+            augmented_path_map.append((previous, current))
+            current, previous = previous, reversed_path_map[previous]
+
+        entrance_room = current
+        if source_bounds[entrance_room] < flow:
+            flow = source_bounds[entrance_room]
+
+        # Update the flow in the path
+        for room, next_room in augmented_path_map:
+            flows[room, next_room] = flows.get((room, next_room), 0) + flow
+            flows[next_room, room] = flows.get((next_room, room), 0) - flow
+
+        source_bounds[entrance_room] -= flow
+        sink_bounds[exit_room] -= flow
+
+        # The sum of all flows will be the maximum flow
+        maximum_flow += flow
+# End of max_flow_virtual_st()
+
+
+def solution(entrances, exits, path, virtual_st=False):
+    """
+    This is just an integral multiple source sink maximum flow problem.
+
+    With virtual_st=True, the super source and sink are implicit, and path is
+    left untouched (so there is no need to deep-copy it before calling this).
+    """
 
     # These are bound to pass in foobar test cases, so making it non-executable
     """
@@ -135,9 +369,633 @@ def solution(entrances, exits, path):
         raise ValueError("A room cannot be both an entrance and an exit.")
     """
 
+    if virtual_st:
+        return max_flow_virtual_st(path, entrances, exits)
+
     # Multiple sources and sinks to single sources and sinks
     convert_to_single_st_problem(path, entrances, exits)
 
     # Return the maximum flow using the Edmonds-Karp algorithm
     return max_flow_edmonds_karp(path)
 # End of solution()
+
+
+def corridors_from_matrix(network):
+    """
+    Yield (room, next_room, capacity) for every nonzero corridor of a sq.
+    matrix, so that the sparse engine never looks at the zero entries again.
+    """
+
+    for room, row in enumerate(network):
+        for next_room, capacity in enumerate(row):
+            if capacity > 0 and room != next_room:
+                yield room, next_room, capacity
+# End of corridors_from_matrix()
+
+
+def build_residual_graph(num_rooms, corridors):
+    """
+    Build a sparse residual graph from (room, next_room, capacity) corridors.
+
+    Returns (adjacency, heads, capacities) where adjacency[room] is the list of
+    edge ids leaving room, heads[edge] is the room the edge points to and
+    capacities[edge] is its residual capacity.
+
+    Edges are stored in pairs, so the reverse of an edge is always edge ^ 1,
+    e.g. the edge 4 (room -> next_room) has edge 5 (next_room -> room).
+    """
+
+    adjacency = [[] for _ in range(num_rooms)]
+    heads, capacities = [], []
+
+    for room, next_room, capacity in corridors:
+        adjacency[room].append(len(heads))
+        heads.append(next_room)
+        capacities.append(capacity)
+
+        adjacency[next_room].append(len(heads))
+        heads.append(room)
+        capacities.append(0)  # Nothing to push back before any flow
+
+    return adjacency, heads, capacities
+# End of build_residual_graph()
+
+
+def build_level_graph(graph, source, sink):
+    """
+    BFS from the source over edges with residual capacity, up to the sink.
+    Returns the list of levels (distance from source, -1 if unreachable or
+    no nearer than the sink, as no shortest path goes through those rooms).
+    """
+
+    adjacency, heads, capacities = graph
+
+    levels = [-1] * len(adjacency)
+    levels[source] = 0
+
+    next_rooms_queue = deque([source])
+
+    while next_rooms_queue and levels[sink] < 0:
+        room = next_rooms_queue.popleft()
+
+        for edge in adjacency[room]:
+            next_room = heads[edge]
+
+            if capacities[edge] > 0 and levels[next_room] < 0:
+                levels[next_room] = levels[room] + 1
+                next_rooms_queue.append(next_room)
+
+    # Rooms labelled as deep as the sink are still in the queue
+    for room in next_rooms_queue:
+        if levels[room] == levels[sink] and room != sink:
+            levels[room] = -1
+
+    return levels
+# End of build_level_graph()
+
+
+def blocking_flow(graph, levels, source, sink):
+    """
+    Saturate the level graph by repeatedly walking source -> sink along edges
+    going exactly one level deeper.
+
+    The DFS is iterative (station layouts can be tens of thousands of rooms
+    deep) and keeps a current-arc pointer per room, so a dead edge is never
+    looked at again in this phase.
+    """
+
+    adjacency, heads, capacities = graph
+
+    current_arc = [0] * len(adjacency)
+    total_flow = 0
+
+    path = []  # Edge ids from source to the current room
+    room = source
+
+    while True:
+        if room == sink:
+            # We need the minimum value, due to bottlenecking in the path
+            flow = min(capacities[edge] for edge in path)
+
+            for edge in path:
+                capacities[edge] -= flow  # In the forward direction
+                capacities[edge ^ 1] += flow  # In the backward direction
+
+            total_flow += flow
+
+            # Retreat to the tail of the first saturated edge and continue
+            saturated = next(index for index, edge in enumerate(path)
+                             if capacities[edge] == 0)
+            room = heads[path[saturated] ^ 1]
+            del path[saturated:]
+            continue
+
+        edges = adjacency[room]
+
+        while current_arc[room] < len(edges):
+            edge = edges[current_arc[room]]
+            if (capacities[edge] > 0
+                    and levels[heads[edge]] == levels[room] + 1):
+                break
+            current_arc[room] += 1
+
+        if current_arc[room] < len(edges):  # Advance
+            path.append(edges[current_arc[room]])
+            room = heads[path[-1]]
+        elif room == source:
+            return total_flow  # Nothing more can leave the source
+        else:  # Dead end, so retreat and never come back in this phase
+            levels[room] = -1
+            edge = path.pop()
+            room = heads[edge ^ 1]
+            current_arc[room] += 1
+# End of blocking_flow()
+
+
+def max_flow_dinic(graph, source, sink):
+    """Find the maximum flow using Dinic's algorithm on a sparse graph."""
+
+    maximum_flow = 0
+
+    while True:
+        levels = build_level_graph(graph, source, sink)
+
+        if levels[sink] < 0:
+            return maximum_flow
+
+        maximum_flow += blocking_flow(graph, levels, source, sink)
+# End of max_flow_dinic()
+
+
+def cancel_flow(graph, room, target, flow, backward=False):
+    """
+    Take flow off the paths the flow already takes from room to target (or
+    from target to room, if backward), and return how much was taken off.
+
+    Only the edges carrying flow are walked, so there's no search over the
+    whole graph like with a push in the residual graph. As every edge is
+    paired by build_residual_graph(), the flow on an edge is the residual
+    capacity of edge | 1 (its reverse, or itself for a reverse edge). Cycles
+    of flow found on the way are taken off too, which changes no total.
+    """
+
+    adjacency, heads, capacities = graph
+
+    parity = 1 if backward else 0  # Walk along the forward/reverse edges
+    current_arc = {}  # An edge left without flow never gets it back here
+    cancelled = 0
+
+    path = []  # Edge ids from room to the current room
+    on_path = {room: 0}  # Room -> length of path when it was reached
+    current = room
+
+    while cancelled < flow:
+        if current == target:
+            amount = min(min(capacities[edge | 1] for edge in path),
+                         flow - cancelled)
+
+            for edge in path:
+                capacities[edge | 1] -= amount
+                capacities[edge & ~1] += amount
+
+            cancelled += amount
+            path, on_path, current = [], {room: 0}, room
+            continue
+
+        edges = adjacency[current]
+        arc = current_arc.get(current, 0)
+
+        while arc < len(edges) and not (edges[arc] & 1 == parity
+                                        and capacities[edges[arc] | 1] > 0):
+            arc += 1
+
+        current_arc[current] = arc
+
+        if arc == len(edges):
+            break  # Flow isn't conserved, as nothing carries it on
+
+        edge = edges[arc]
+        next_room = heads[edge]
+
+        if next_room not in on_path:
+            path.append(edge)
+            on_path[next_room] = len(path)
+            current = next_room
+            continue
+
+        # A cycle back to next_room, so take its flow off and go back there
+        start = on_path[next_room]
+        cycle = path[start:] + [edge]
+        amount = min(capacities[cycle_edge | 1] for cycle_edge in cycle)
+
+        for cycle_edge in cycle:
+            capacities[cycle_edge | 1] -= amount
+            capacities[cycle_edge & ~1] += amount
+
+        for cycle_edge in path[start:]:
+            del on_path[heads[cycle_edge]]
+        del path[start:]
+        current = next_room
+
+    return cancelled
+# End of cancel_flow()
+
+
+def load_corridors(path=None, corridors=None, rooms=()):
+    """
+    Return (num_rooms, corridors) from either path (the usual sq. matrix, which
+    isn't modified) or corridors (an edge list of (room, next_room, capacity)
+    tuples). rooms are any other rooms (like entrances) which must exist.
+    """
+
+    if path is not None:
+        return len(path), list(corridors_from_matrix(path))
+
+    if corridors is None:
+        raise ValueError("Either path or corridors must be given.")
+
+    corridors = list(corridors)
+    num_rooms = 1 + max([room for corridor in corridors
+                         for room in corridor[:2]] + list(rooms))
+
+    return num_rooms, corridors
+# End of load_corridors()
+
+
+def get_corridor_bounds(num_rooms, corridors):
+    """Return lists of the total outgoing and incoming capacity of rooms."""
+
+    outgoing, incoming = [0] * num_rooms, [0] * num_rooms
+
+    for room, next_room, capacity in corridors:
+        outgoing[room] += capacity
+        incoming[next_room] += capacity
+
+    return outgoing, incoming
+# End of get_corridor_bounds()
+
+
+def sparse_solution(entrances, exits, path=None, corridors=None):
+    """
+    Same answer as solution(), but on a sparse residual graph.
+
+    Either pass path (the usual sq. matrix, which isn't modified) or corridors
+    (an edge list of (room, next_room, capacity) tuples). Only nonzero
+    corridors are ever visited, so each BFS costs O(V + E) instead of O(V^2).
+    """
+
+    num_rooms, corridors = load_corridors(path, corridors,
+                                          list(entrances) + list(exits))
+
+    # Super source and sink are appended after the rooms. Their edges get the
+    # entrances' outgoing (and exits' incoming) capacity, which can never be
+    # exceeded anyway, so we don't need infinite capacities.
+    source, sink = num_rooms, num_rooms + 1
+
+    outgoing, incoming = get_corridor_bounds(num_rooms, corridors)
+
+    corridors.extend((source, room, outgoing[room]) for room in entrances)
+    corridors.extend((room, sink, incoming[room]) for room in exits)
+
+    graph = build_residual_graph(num_rooms + 2, corridors)
+
+    return max_flow_dinic(graph, source, sink)
+# End of sparse_solution()
+
+
+class CutIndex(object):
+    """
+    Answer many entrances/exits queries on one network, along with the
+    min-cut (the bottleneck corridors).
+
+    The sparse residual graph is built once, with a disabled (0 capacity)
+    super source -> room and room -> super sink edge for every room, and it
+    keeps the maximum flow of the last query. A new query only takes off the
+    flow of the entrances and exits it doesn't have, and augments from the
+    rest, like IncrementalMaxFlow does for corridors. Answers are cached per
+    (entrances, exits) as well.
+
+    Gomory-Hu trees only exist for undirected networks and single pairs, so
+    when every corridor has the same capacity both ways, a (Gusfield) flow
+    equivalent tree is built lazily as well, and single entrance-exit queries
+    are answered from it in O(V) without any max flow at all.
+    """
+
+    def __init__(self, path=None, corridors=None):
+        num_rooms, corridors = load_corridors(path, corridors)
+        self.num_rooms = num_rooms
+        self.num_corridors = len(corridors)
+        self.corridors = corridors
+
+        self.source, self.sink = num_rooms, num_rooms + 1
+        self.outgoing, self.incoming = get_corridor_bounds(num_rooms,
+                                                           corridors)
+
+        # Edge ids of super edges, as build_residual_graph() pairs the edges
+        first_super_edge = 2 * len(corridors)
+        self.source_edges = [first_super_edge + 2 * room
+                             for room in range(num_rooms)]
+        self.sink_edges = [first_super_edge + 2 * (num_rooms + room)
+                           for room in range(num_rooms)]
+
+        self.graph = build_residual_graph(
+            num_rooms + 2,
+            corridors
+            + [(self.source, room, 0) for room in range(num_rooms)]
+            + [(room, self.sink, 0) for room in range(num_rooms)]
+        )
+
+        # The query the flow in self.graph is for
+        self.entrances, self.exits = set(), set()
+        self.maximum_flow = 0
+
+        self.symmetric = self._is_symmetric()
+        self.cut_tree = None  # (parents, flows), built by build_cut_tree()
+        self.cache = {}
+    # End of __init__()
+
+    def _is_symmetric(self):
+        """Return if every corridor has the same capacity in both ways."""
+
+        capacities = {}
+        for room, next_room, capacity in self.corridors:
+            key = (room, next_room)
+            capacities[key] = capacities.get(key, 0) + capacity
+
+        return all(capacities.get((next_room, room), 0) == capacity
+                   for (room, next_room), capacity in capacities.items())
+    # End of _is_symmetric()
+
+    def _solve(self, entrances, exits):
+        """
+        Move the flow of the last query over to this one, and return the
+        maximum flow.
+
+        A removed entrance (exit) has the flow it sent (received) cancelled
+        along its paths to the super sink (from the super source), and its
+        super edge closed. Added ones just open their super edge, and Dinic
+        augments from whatever flow is left.
+        """
+
+        graph, capacities = self.graph, self.graph[2]
+        entrances, exits = set(entrances), set(exits)
+
+        for room in self.entrances - entrances:
+            edge = self.source_edges[room]
+            self.maximum_flow -= cancel_flow(graph, room, self.sink,
+                                             capacities[edge ^ 1])
+            capacities[edge] = capacities[edge ^ 1] = 0
+
+        for room in self.exits - exits:
+            edge = self.sink_edges[room]
+            self.maximum_flow -= cancel_flow(graph, room, self.source,
+                                             capacities[edge ^ 1],
+                                             backward=True)
+            capacities[edge] = capacities[edge ^ 1] = 0
+
+        for room in entrances - self.entrances:
+            capacities[self.source_edges[room]] = self.outgoing[room]
+        for room in exits - self.exits:
+            capacities[self.sink_edges[room]] = self.incoming[room]
+
+        self.entrances, self.exits = entrances, exits
+        self.maximum_flow += max_flow_dinic(graph, self.source, self.sink)
+
+        return self.maximum_flow
+    # End of _solve()
+
+    def min_cut(self, entrances, exits):
+        """
+        Return (maximum_flow, source_side, bottlenecks) for the query.
+
+        source_side is the set of rooms still reachable from the entrances in
+        the final residual graph, and bottlenecks is the list of
+        (room, next_room, capacity) corridors crossing out of it; their
+        capacities sum up to the maximum flow.
+        """
+
+        key = (frozenset(entrances), frozenset(exits))
+        if key in self.cache and self.cache[key][1] is not None:
+            return self.cache[key]
+
+        maximum_flow = self._solve(entrances, exits)
+
+        levels = build_level_graph(self.graph, self.source, self.sink)
+        source_side = set(room for room in range(self.num_rooms)
+                          if levels[room] >= 0)
+
+        # A saturated super edge means all of that entrance's (exit's)
+        # corridors are saturated instead, so report the cut on those.
+        source_side.update(entrances)
+        source_side.difference_update(exits)
+
+        bottlenecks = [
+            (room, next_room, capacity)
+            for room, next_room, capacity in self.corridors
+            if room in source_side and next_room not in source_side
+        ]
+
+        self.cache[key] = (maximum_flow, source_side, bottlenecks)
+
+        return self.cache[key]
+    # End of min_cut()
+
+    def max_flow(self, entrances, exits):
+        """Return the maximum flow from entrances to exits."""
+
+        key = (frozenset(entrances), frozenset(exits))
+        if key in self.cache:
+            return self.cache[key][0]
+
+        # The tree only has the flow between two different rooms
+        if self.symmetric and len(key[0]) == len(key[1]) == 1 \
+                and key[0] != key[1]:
+            maximum_flow = self._tree_query(min(key[0]), min(key[1]))
+        else:
+            maximum_flow = self._solve(entrances, exits)
+
+        self.cache[key] = (maximum_flow, None, None)  # Cut isn't known yet
+
+        return maximum_flow
+    # End of max_flow()
+
+    def build_cut_tree(self):
+        """
+        Build the flow equivalent tree using Gusfield's algorithm; that's
+        V - 1 single pair max flows, after which the max flow between any two
+        rooms is the minimum flow on the tree path joining them.
+        """
+
+        if not self.symmetric:
+            raise ValueError("A cut tree needs the same capacity both ways.")
+
+        parents = [0] * self.num_rooms
+        flows = [0] * self.num_rooms
+
+        for room in range(1, self.num_rooms):
+            parent = parents[room]
+            flows[room] = self._solve([room], [parent])
+
+            levels = build_level_graph(self.graph, self.source, self.sink)
+
+            for other_room in range(room + 1, self.num_rooms):
+                if levels[other_room] >= 0 and parents[other_room] == parent:
+                    parents[other_room] = room
+
+        self.cut_tree = (parents, flows)
+    # End of build_cut_tree()
+
+    def _tree_query(self, entrance, exit_room):
+        """Minimum flow on the cut tree path between two rooms."""
+
+        if self.cut_tree is None:
+            self.build_cut_tree()
+
+        parents, flows = self.cut_tree
+
+        # Walk up from the entrance, remembering the minimum on the way
+        minimum_to = {entrance: None}
+        room, minimum = entrance, None
+        while room != 0:
+            minimum = min(minimum, flows[room]) if minimum is not None \
+                else flows[room]
+            room = parents[room]
+            minimum_to[room] = minimum
+
+        # Walk up from the exit until we meet the entrance's path
+        room, minimum = exit_room, None
+        while room not in minimum_to:
+            minimum = min(minimum, flows[room]) if minimum is not None \
+                else flows[room]
+            room = parents[room]
+
+        candidates = [flow for flow in (minimum, minimum_to[room])
+                      if flow is not None]
+
+        return min(candidates) if candidates else 0
+    # End of _tree_query()
+# End of CutIndex
+
+
+def max_flow_dense(network, source, sink):
+    """
+    Find the maximum flow using Dinic's algorithm, on a residual network
+    stored as a contiguous int64 NumPy array (which is modified in place).
+
+    Each BFS level is expanded as one vectorized operation over the whole
+    frontier. The blocking flow is the same current-arc DFS as
+    blocking_flow(), but the edges of the level graph leaving a room are
+    found with one vectorized operation over its row, the first time the
+    room is reached in a phase, so the interpreter only ever looks at edges
+    of the level graph.
+    """
+
+    maximum_flow = 0
+
+    levels = numpy.empty(len(network), dtype=numpy.int64)
+
+    while True:
+        levels.fill(-1)
+        levels[source] = 0
+        frontier = numpy.array([source], dtype=numpy.int64)
+        depth = 0
+
+        while frontier.size and levels[sink] < 0:
+            # Unvisited rooms with residual capacity from the frontier
+            reachable = (network[frontier] > 0).any(axis=0)
+            reachable &= levels < 0
+
+            depth += 1
+            frontier = numpy.flatnonzero(reachable)
+            levels[frontier] = depth
+
+        if levels[sink] < 0:
+            return maximum_flow
+
+        # No shortest path goes through the other rooms as deep as the sink
+        levels[frontier[frontier != sink]] = -1
+
+        next_rooms = {}  # Room -> its edges of the level graph, in order
+        current_arc = {}
+        dead_ends = set()
+
+        path = [source]  # Rooms from the source to the current room
+
+        while True:
+            room = path[-1]
+
+            if room == sink:
+                rooms = numpy.array(path)
+                previous_rooms, rooms = rooms[:-1], rooms[1:]
+
+                # We need the minimum value, due to bottlenecking in the path
+                flow = network[previous_rooms, rooms].min()
+
+                network[previous_rooms, rooms] -= flow  # Forward direction
+                network[rooms, previous_rooms] += flow  # Backward direction
+
+                # The sum of all flows will be the maximum flow
+                maximum_flow += int(flow)
+
+                # Retreat to the tail of the first saturated edge
+                saturated = numpy.flatnonzero(
+                    network[previous_rooms, rooms] == 0)[0]
+                del path[saturated + 1:]
+                continue
+
+            if room not in next_rooms:
+                next_rooms[room] = numpy.flatnonzero(
+                    (network[room] > 0) & (levels == levels[room] + 1)
+                ).tolist()
+                current_arc[room] = 0
+
+            edges, row = next_rooms[room], network[room]
+            arc = current_arc[room]
+
+            while arc < len(edges) and (row[edges[arc]] <= 0
+                                        or edges[arc] in dead_ends):
+                arc += 1
+
+            current_arc[room] = arc
+
+            if arc < len(edges):  # Advance
+                path.append(edges[arc])
+            elif room == source:
+                break  # Nothing more can leave the source in this phase
+            else:  # Dead end, so retreat and never come back in this phase
+                dead_ends.add(room)
+                path.pop()
+                current_arc[path[-1]] += 1
+# End of max_flow_dense()
+
+
+def dense_solution(entrances, exits, path):
+    """
+    Same answer as solution(), but with the residual network in an int64
+    NumPy array (path itself isn't modified). Needs NumPy.
+
+    It only pulls ahead of sparse_solution() on big, dense networks (about
+    20% faster at 400 rooms and 90% density, 30% at 2000 rooms and 50%, see
+    benchmark.py); below that they're about even, and sparse_solution() is
+    the one for networks with only a few corridors per room.
+    """
+
+    if numpy is None:
+        raise ImportError("dense_solution() needs NumPy.")
+
+    num_rooms = len(path)
+
+    # Super source is the first room and super sink the last one, just like
+    # with convert_to_single_st_problem(), but with one copy into the array.
+    network = numpy.zeros((num_rooms + 2, num_rooms + 2), dtype=numpy.int64)
+    network[1:-1, 1:-1] = path
+
+    entrances = numpy.asarray(entrances, dtype=numpy.int64) + 1
+    exits = numpy.asarray(exits, dtype=numpy.int64) + 1
+
+    # Outgoing (incoming) capacity in place of infinity, as in solution()
+    network[0, entrances] = network[entrances].sum(axis=1)
+    network[exits, -1] = network[:, exits].sum(axis=0)
+
+    return max_flow_dense(network, 0, num_rooms + 1)
+# End of dense_solution()
@@ -0,0 +1,104 @@
+"""
+Compare solutions() against calling solution() in a loop, on batches of
+nearby n, and the floor sums against naive summation.
+
+Run from this directory: python benchmark.py
+"""
+
+import random
+from timeit import default_timer
+
+import sol
+
+
+def nearby_batch(digits, size, spread=10**6, seed=0):
+    """Return size random str n within spread of a random n of digits."""
+
+    generator = random.Random(seed)
+    centre = generator.randint(10**(digits - 1), 10**digits)
+
+    return [str(centre + generator.randint(0, spread)) for _ in range(size)]
+# End of nearby_batch()
+
+
+def time_it(function, *args):
+    """Return (result, seconds) of a single call."""
+
+    start = default_timer()
+    result = function(*args)
+    return result, default_timer() - start
+# End of time_it()
+
+
+def naive_floor_sum(n, a, b, m):
+    """Sum floor((a*i + b)/m) for i from 1 to n, term by term."""
+    return sum((a * i + b) // m for i in range(1, n + 1))
+# End of naive_floor_sum()
+
+
+def naive_progression_sum(start, step, count, a, b, d, c=1):
+    """Sum floor(k*r) over the progression, term by term."""
+    return sum(sol.floor_quadratic((start + step * j) * a,
+                                   (start + step * j) * b, d, c)
+               for j in range(count))
+# End of naive_progression_sum()
+
+
+def benchmark_batches():
+    print("%6s %6s  %10s %10s %8s" % ("digits", "batch", "solution",
+                                      "solutions", "speedup"))
+
+    for digits, size in [(10, 1000), (100, 1000), (1000, 200),
+                         (3000, 50)]:
+        str_ns = nearby_batch(digits, size)
+
+        sol.CHAIN_CACHE.clear()
+        looped, looped_seconds = time_it(
+            lambda: [sol.solution(str_n) for str_n in str_ns])
+        batched, batched_seconds = time_it(sol.solutions, str_ns)
+
+        assert looped == batched, "solutions() disagrees with solution()"
+
+        print("%6d %6d  %9.3fs %9.3fs %7.1fx"
+              % (digits, size, looped_seconds, batched_seconds,
+                 looped_seconds / batched_seconds))
+# End of benchmark_batches()
+
+
+def benchmark_floor_sums():
+    generator = random.Random(0)
+
+    print("\n%6s  %10s %10s %10s %10s" % ("n", "naive", "floor_sum",
+                                          "naive AP", "AP sums"))
+
+    for n in [10, 100, 1000, 10000]:
+        rational = [(n, generator.randint(-10**6, 10**6),
+                     generator.randint(-10**6, 10**6),
+                     generator.randint(1, 10**6)) for _ in range(100)]
+        progressions = [(generator.randint(-10**3, 10**3),
+                         generator.randint(1, 10**3), n, 0, 1, 2)
+                        for _ in range(100)]
+
+        row = []
+        for naive, batch, queries in [
+                (naive_floor_sum, sol.floor_sums, rational),
+                (naive_progression_sum, sol.progression_sums, progressions)]:
+            expected, naive_seconds = time_it(
+                lambda: [naive(*query) for query in queries])
+            result, batch_seconds = time_it(batch, queries)
+
+            assert result == expected, "%s() disagrees" % batch.__name__
+            row += [naive_seconds, batch_seconds]
+
+        print("%6d  " % n + " ".join("%9.4fs" % seconds for seconds in row))
+# End of benchmark_floor_sums()
+
+
+def main():
+    benchmark_batches()
+    benchmark_floor_sums()
+# End of main()
+
+
+if __name__ == "__main__":
+    main()
@@ -91,21 +91,46 @@ Useless side note: The given sequence (with r = sqrt(2)) is A001951 on OEIS.
 """
 
 
-# Set some variables which will be needed during recursion
+import os
+import sys
+from collections import OrderedDict
+from fractions import gcd
+from itertools import starmap
 
-GOOGOL = 10**100  # Google foobar hmmmm...
 
-# import decimal
-# decimal.getcontext().prec = 101
-# sqrt_2 = Decimal(2).sqrt()
-# Now get all the digits after the decimal point, it's (sqrt(2) - 1)*10^100
-# This is done to get precision right, which is the bug we are exploiting
+# decimal_conversion.py is at the root of the repo, see its docstring.
+repo_root = os.path.normpath(os.path.join(os.path.dirname(
+    os.path.abspath(__file__)), os.pardir, os.pardir))
 
-SQRT_2_MINUS_1 = long("41421356237309504880168872420969807856967187537694"
-                      "80731766797379907324784621070388503875343276415727")
+# Only put it on sys.path (and take it off) if it isn't there already
+on_path = repo_root in sys.path
+if not on_path:
+    sys.path.append(repo_root)
+try:
+    from decimal_conversion import int_to_str, str_to_int
+except ImportError:
+    int_to_str, str_to_int = str, long
+finally:
+    if not on_path:
+        sys.path.remove(repo_root)
+    del repo_root, on_path
 
 
-# These were set so as to not repeatedly make new objects.
+# Every floor(k*sqrt(d)) is read off a cached fixed-point root of d.  The root
+# is truncated to the precision k needs plus some guard bits, which makes the
+# rare cases where the truncation could round down cheap to detect.
+
+GUARD_BITS = 32
+
+SQRT_CACHE = {}  # d -> (precision, floor(sqrt(d) * 2^precision))
+
+
+# Sums of the links of the n -> n' chains, shared by solutions().  Chains of
+# nearby n run into each other after a few steps.  It's an LRU cache.
+
+CHAIN_CACHE = OrderedDict()  # (n, a, b, d, c) -> sum(r, n)
+CHAIN_CACHE_SIZE = 4096
+
 
 # Functions implementing the solution are as follows
 
@@ -116,31 +141,296 @@ def sigma_n(n):
 # End of sigma_n()
 
 
-def sum_beatty(n):
-    """Sum the sequence using the equation derived"""
+def integer_sqrt(n):
+    """Return floor(sqrt(n)) for a non-negative integer n."""
+
+    if n < 2:
+        return n
+
+    # Newton's method, starting from a power of 2 above the root
+    x = 1 << ((n.bit_length() + 1) / 2)
+    while True:
+        y = (x + n / x) / 2
+        if y >= x:
+            return x
+        x = y
+# End of integer_sqrt()
+
+
+def floor_sqrt_multiple(k, d):
+    """Return floor(k*sqrt(d)) for an integer k >= 0 and a non-square d."""
+
+    precision = k.bit_length() + GUARD_BITS
+
+    cached_precision, root = SQRT_CACHE.get(d, (0, 0))
+    if cached_precision < precision:
+        # Grow geometrically so a shrinking k never recomputes the root
+        cached_precision = max(precision, 2 * cached_precision)
+        root = integer_sqrt(d << (2 * cached_precision))
+        SQRT_CACHE[d] = (cached_precision, root)
+
+    root >>= cached_precision - precision  # floor(sqrt(d) * 2^precision)
+
+    # The truncated root is short by less than 1, so the product is short by
+    # less than k, and the floor can only be off by one if the low bits of
+    # the product are within k of carrying.
+    product = k * root
+    floor = product >> precision
+
+    if (product & ((1 << precision) - 1)) + k >= 1 << precision:
+        if (floor + 1) ** 2 <= k * k * d:
+            floor += 1
+
+    return floor
+# End of floor_sqrt_multiple()
+
+
+def floor_quadratic(a, b, d, c):
+    """Return floor((a + b*sqrt(d))/c) for c > 0 and a non-square d."""
+
+    if b == 0:
+        return a // c
+
+    if b > 0:
+        x = floor_sqrt_multiple(b, d)
+    else:
+        # b*sqrt(d) is irrational, so its floor is one below its ceiling
+        x = -floor_sqrt_multiple(-b, d) - 1
+
+    # Adding the fractional part (0, 1) of b*sqrt(d) never crosses a
+    # multiple of c, so the floor comes from integers alone.
+    return (a + x) // c
+# End of floor_quadratic()
+
+
+def sum_floor_quadratic(n, a, b, d, c=1, memo=None):
+    """
+    Return the sum of floor(i*r) for i from 1 to n, where r = (a+b*sqrt(d))/c
+    is an irrational number.
+
+    This is the recursion in the docstring above, carried out for any r:
+    integer parts of r are peeled off with sigma_n(), and the fractional part
+    s in (0, 1) is swapped for 1/s by counting lattice points under i*s,
+
+        sum(s, n) = n*floor(n*s) - sum(1/s, floor(n*s))
+
+    with 1/s kept in the same (a + b*sqrt(d))/c form.  n shrinks at every
+    step, so the chain is walked with a loop and then summed up backwards.
+
+    If a memo (an OrderedDict, see CHAIN_CACHE) is given, the sum of every
+    link of the chain is looked up in and stored to it, so chains which
+    run into each other are only walked once.
+    """
+
+    if d <= 0 or b == 0 or integer_sqrt(d) ** 2 == d:
+        raise ValueError("r must be irrational.")
+
+    if c == 0:
+        raise ValueError("c must be non-zero.")
+
+    if c < 0:
+        a, b, c = -a, -b, -c
+
+    if floor_quadratic(a, b, d, c) < 0:
+        # floor(-x) = -floor(x) - 1 for every irrational x
+        return -n - sum_floor_quadratic(n, -a, -b, d, c, memo)
+
+    chain, total = [], 0
+
+    while n > 0:
+        key = (n, a, b, d, c)
+        if memo is not None and key in memo:
+            total = memo[key] = memo.pop(key)  # Move to the recent end
+            break
 
-    if n == 0:
-        return 0
+        whole = floor_quadratic(a, b, d, c)
+        a -= whole * c
 
-    n_prime = (n * SQRT_2_MINUS_1) // GOOGOL  # int division will act as floor
+        n_prime = floor_quadratic(n * a, n * b, d, c)
+        chain.append((key, whole * sigma_n(n) + n * n_prime))
 
-    return n*n_prime + sigma_n(n) - sigma_n(n_prime) - sum_beatty(n_prime)
+        # 1/s = c/(a + b*sqrt(d)) = c*(a - b*sqrt(d))/(a^2 - b^2*d)
+        a, b, c = c * a, -c * b, a * a - b * b * d
+        if c < 0:
+            a, b, c = -a, -b, -c
+
+        divisor = abs(gcd(gcd(a, b), c))
+        if divisor > 1:
+            a, b, c = a / divisor, b / divisor, c / divisor
+
+        n = n_prime
+
+    for key, term in reversed(chain):
+        total = term - total
+        if memo is not None:
+            memo[key] = total
+
+    if memo is not None:
+        while len(memo) > CHAIN_CACHE_SIZE:
+            memo.popitem(last=False)
+
+    return total
+# End of sum_floor_quadratic()
+
+
+def sum_beatty(n, memo=None):
+    """Sum the sequence floor(i*sqrt(2)) for i from 1 to n."""
+    return sum_floor_quadratic(n, 0, 1, 2, memo=memo)
 # End of sum_beatty()
 
 
+def floor_sum(n, a, b, m):
+    """
+    Return the sum of floor((a*i + b)/m) for i from 1 to n, for any ints.
+
+    The same reduction as for irrational r: the integer parts of a/m and b/m
+    are peeled off, and the lattice points under the line are then counted
+    along the other axis, which swaps a and m like Euclid's algorithm.
+    """
+
+    if m == 0:
+        raise ValueError("m must be non-zero.")
+
+    if m < 0:
+        a, b, m = -a, -b, -m
+
+    # Count i from 0 to n - 1 instead, it makes the swap simpler
+    b += a
+    total = 0
+
+    while n > 0:
+        total += (a // m) * n * (n - 1) / 2 + (b // m) * n
+        a, b = a % m, b % m
+
+        # The line a*i + b ends at y_max, the points under it are counted
+        # along the y axis as floor((m*j + y_max % m)/a) for j < y_max / m
+        y_max = a * n + b
+        n, a, b, m = y_max / m, m, y_max % m, a
+
+    return total
+# End of floor_sum()
+
+
+def sum_floor_affine(n, a, b, e, f, d, c=1):
+    """
+    Return the sum of floor(i*r + t) for i from 1 to n, where r and t are
+    (a + b*sqrt(d))/c and (e + f*sqrt(d))/c.
+
+    With r, t in [0, 1), the points under the line are counted from the
+    other axis, the same as in sum_floor_quadratic(),
+
+        sum(r, t, n) = n*M - sum(1/r, -t/r, M) + [i*r + t is an int for
+                                                  some i in 1..n]
+
+    where M = floor(n*r + t).  Once the offset is there, i*r + t can land
+    on an int, which the last term takes care of (it happens at most once,
+    as r is irrational).
+    """
+
+    if b == 0 and f == 0:
+        return floor_sum(n, a, e, c)
+
+    if d <= 0 or integer_sqrt(d) ** 2 == d:
+        raise ValueError("d must be a positive non-square.")
+
+    if c == 0:
+        raise ValueError("c must be non-zero.")
+
+    if c < 0:
+        a, b, e, f, c = -a, -b, -e, -f, -c
+
+    total, sign = 0, 1
+
+    while n > 0:
+        if n <= 2:
+            # With an int hit, M can stay equal to n here, so sum it up
+            # directly.  For n >= 3, M < n at least every other step.
+            total += sign * sum(floor_quadratic(i * a + e, i * b + f, d, c)
+                                for i in range(1, n + 1))
+            break
+
+        whole = floor_quadratic(a, b, d, c)
+        offset = floor_quadratic(e, f, d, c)
+        total += sign * (whole * sigma_n(n) + offset * n)
+        a, e = a - whole * c, e - offset * c
+
+        if a == 0 and b == 0:
+            break  # A rational r became an int, every floor left is 0
+
+        M = floor_quadratic(n * a + e, n * b + f, d, c)
+
+        # i*r + t is an int iff i*b + f = 0 and c divides i*a + e
+        hit = (b != 0 and f % b == 0 and 1 <= -f / b <= n
+               and (-f / b * a + e) % c == 0)
+
+        total += sign * (n * M + hit)
+        sign = -sign
+
+        # 1/r = c*(a - b*sqrt(d))/(a^2 - b^2*d), and -t/r is
+        # -(e + f*sqrt(d))*(a - b*sqrt(d))/(a^2 - b^2*d)
+        a, b, e, f, c = (c * a, -c * b, f * b * d - e * a, e * b - f * a,
+                         a * a - b * b * d)
+        if c < 0:
+            a, b, e, f, c = -a, -b, -e, -f, -c
+
+        divisor = abs(reduce(gcd, (a, b, e, f), c))
+        if divisor > 1:
+            a, b, e, f, c = (a / divisor, b / divisor, e / divisor,
+                             f / divisor, c / divisor)
+
+        n = M
+
+    return total
+# End of sum_floor_affine()
+
+
+def sum_floor_progression(start, step, count, a, b, d, c=1):
+    """
+    Return the sum of floor(k*r) over the arithmetic progression k = start,
+    start + step, ..., start + (count - 1)*step, where r = (a+b*sqrt(d))/c.
+    """
+
+    # k = step*i + (start - step) for i from 1 to count
+    return sum_floor_affine(count, step * a, step * b, (start - step) * a,
+                            (start - step) * b, d, c)
+# End of sum_floor_progression()
+
+
+def floor_sums(queries):
+    """Return floor_sum(n, a, b, m) for each (n, a, b, m) of queries."""
+    return list(starmap(floor_sum, queries))
+# End of floor_sums()
+
+
+def progression_sums(queries):
+    """
+    Return sum_floor_progression(start, step, count, a, b, d, c) for each
+    tuple of queries, in order.
+    """
+    return list(starmap(sum_floor_progression, queries))
+# End of progression_sums()
+
+
 def solution(str_n):
 
     # Convert from string to long
-    n = long(str_n)
+    n = str_to_int(str_n)
 
     # The foobar tests will have valid inputs, so we don't need to check here
-    """
-    if not (1 <= n <= GOOGOL):
-        raise ValueError("n must be in range [1, 10^100].")
-    """
+    # Unlike the 100 digit constant this used to use, n can be of any size.
 
-    return str(sum_beatty(n))
+    return int_to_str(sum_beatty(n))
 # End of solution
 
 
+def solutions(str_ns):
+    """
+    Same as solution() for each of str_ns, in order, with the chains shared
+    through CHAIN_CACHE.
+    """
+    return [int_to_str(sum_beatty(str_to_int(str_n), CHAIN_CACHE))
+            for str_n in str_ns]
+# End of solutions()
+
+
 # End of file